@@ -0,0 +1,272 @@
+"""
+Pluggable CPU inference backends for the YOLO model.
+
+``models/best.pt`` is always the source of truth. For ``onnx`` and
+``openvino`` it is exported once (optionally INT8-quantized from a small
+folder of calibration photos) into ``models/exports/`` under a name that
+includes the weights checksum, so a new ``best.pt`` gets a fresh export and
+restarts reuse the cached one. Ultralytics loads every artifact through the
+same ``YOLO(...)`` interface, so the rest of the server doesn't care which
+runtime is underneath.
+
+Command line:
+
+    python backends.py export --backend onnx --int8 --calibration calib/
+    python backends.py parity --backend openvino --images samples/
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from detection_cache import model_fingerprint
+from postprocess import box_iou
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+EXPORTS_DIR = Path(__file__).resolve().parent / "models" / "exports"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+def list_images(folder) -> list:
+    return sorted(
+        p for p in Path(folder).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+def artifact_path(weights, backend: str, imgsz: int = 640, int8: bool = False) -> Path:
+    """Where the exported artifact for these weights/backend/options is cached"""
+    weights = Path(weights)
+    checksum = model_fingerprint(weights).partition(":")[2] or "nochecksum"
+    variant = f"{weights.stem}-{checksum}-{backend}{'-int8' if int8 else ''}-{imgsz}"
+    if backend == "onnx":
+        return EXPORTS_DIR / variant / f"{weights.stem}.onnx"
+    return EXPORTS_DIR / variant / f"{weights.stem}_openvino_model"
+
+
+# ─────────────────────────────────────────────────────────────
+# INT8 calibration
+# ─────────────────────────────────────────────────────────────
+
+
+def letterbox(image: Image.Image, imgsz: int = 640) -> np.ndarray:
+    """Resize + pad like ultralytics does, as a 1x3xHxW float32 tensor in [0, 1]"""
+    image = image.convert("RGB")
+    ratio = imgsz / max(image.size)
+    w, h = max(1, round(image.width * ratio)), max(1, round(image.height * ratio))
+    canvas = Image.new("RGB", (imgsz, imgsz), (114, 114, 114))
+    canvas.paste(image.resize((w, h), Image.Resampling.BILINEAR), ((imgsz - w) // 2, (imgsz - h) // 2))
+    array = np.asarray(canvas, dtype=np.float32) / 255.0
+    return array.transpose(2, 0, 1)[None]
+
+
+def quantize_onnx(fp32_path: Path, int8_path: Path, calibration_dir, imgsz: int = 640):
+    """Static INT8 post-training quantization of an ONNX export (QDQ format)"""
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+
+    images = list_images(calibration_dir)
+    if not images:
+        raise ValueError(f"No calibration images found in {calibration_dir}")
+
+    class FolderReader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.input_name = input_name
+            self.paths = iter(images)
+
+        def get_next(self):
+            path = next(self.paths, None)
+            if path is None:
+                return None
+            with Image.open(path) as image:
+                return {self.input_name: letterbox(image, imgsz)}
+
+    import onnxruntime
+
+    session = onnxruntime.InferenceSession(str(fp32_path), providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    del session
+
+    quantize_static(
+        str(fp32_path),
+        str(int8_path),
+        FolderReader(input_name),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+
+
+def calibration_yaml(calibration_dir, names: dict, workdir: Path) -> Path:
+    """Minimal dataset yaml so ultralytics/NNCF can calibrate OpenVINO INT8"""
+    folder = Path(calibration_dir).resolve()
+    lines = [f"path: {folder}", "train: .", "val: .", "names:"]
+    lines += [f"  {class_id}: {json.dumps(name)}" for class_id, name in names.items()]
+    path = workdir / "calibration.yaml"
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+# ─────────────────────────────────────────────────────────────
+# Export + load
+# ─────────────────────────────────────────────────────────────
+
+
+def export_model(
+    weights, backend: str, imgsz: int = 640, int8: bool = False, calibration_dir=None
+) -> Path:
+    """
+    Export ``weights`` for ``backend`` unless a cached export already exists.
+    Returns the artifact path.
+    """
+    if backend not in BACKENDS or backend == "pytorch":
+        raise ValueError(f"Nothing to export for backend '{backend}'")
+    if int8 and not calibration_dir:
+        raise ValueError("INT8 export needs a calibration image folder")
+
+    target = artifact_path(weights, backend, imgsz, int8)
+    if target.exists():
+        return target
+
+    from ultralytics import YOLO
+
+    print(f"📦 Exporting {Path(weights).name} to {backend}{' (INT8)' if int8 else ''}...")
+    started = time.perf_counter()
+    target.parent.mkdir(parents=True, exist_ok=True)
+    source = YOLO(str(weights))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if backend == "onnx":
+            exported = Path(source.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True))
+            if int8:
+                quantize_onnx(exported, target, calibration_dir, imgsz)
+                exported.unlink()
+            else:
+                shutil.move(str(exported), str(target))
+        else:
+            options = {"format": "openvino", "imgsz": imgsz, "dynamic": True}
+            if int8:
+                options.update(
+                    int8=True, data=str(calibration_yaml(calibration_dir, source.names, Path(workdir)))
+                )
+            exported = Path(source.export(**options))
+            shutil.move(str(exported), str(target))
+
+    print(f"✅ Export ready in {time.perf_counter() - started:.1f}s: {target}")
+    return target
+
+
+def load_model(
+    weights, backend: str = "pytorch", imgsz: int = 640, int8: bool = False, calibration_dir=None
+):
+    """Load ``weights`` as an ultralytics model running on ``backend``"""
+    from ultralytics import YOLO
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    if backend == "pytorch":
+        return YOLO(str(weights))
+    artifact = export_model(weights, backend, imgsz, int8, calibration_dir)
+    return YOLO(str(artifact), task="detect")
+
+
+# ─────────────────────────────────────────────────────────────
+# Parity check
+# ─────────────────────────────────────────────────────────────
+
+
+def match_detections(reference: np.ndarray, candidate: np.ndarray, iou_threshold: float = 0.5):
+    """
+    Greedily match (n, 6) xyxy/conf/cls detections of the same class.
+    Returns a list of (iou, |conf difference|) for matched pairs.
+    """
+    if not len(reference) or not len(candidate):
+        return []
+    ious = box_iou(reference[:, :4], candidate[:, :4])
+    ious[reference[:, None, 5] != candidate[None, :, 5]] = 0
+    matches = []
+    for i in np.argsort(-reference[:, 4]):
+        j = int(np.argmax(ious[i]))
+        if ious[i, j] >= iou_threshold:
+            matches.append((float(ious[i, j]), abs(float(reference[i, 4] - candidate[j, 4]))))
+            ious[:, j] = 0
+    return matches
+
+
+def compare_backends(reference, candidate, images: list, conf: float = 0.30, iou_threshold: float = 0.5) -> dict:
+    """
+    Run both models over ``images`` and report how closely ``candidate``
+    reproduces ``reference`` (normally the PyTorch model) plus their latency.
+    """
+    from postprocess import boxes_to_numpy
+
+    ref_total = cand_total = 0
+    matches = []
+    ref_ms, cand_ms = [], []
+
+    for path in images:
+        with Image.open(path) as image:
+            image = image.convert("RGB")
+            started = time.perf_counter()
+            ref = boxes_to_numpy(reference(image, conf=conf, device="cpu", verbose=False)[0].boxes)
+            ref_ms.append(1000 * (time.perf_counter() - started))
+            started = time.perf_counter()
+            cand = boxes_to_numpy(candidate(image, conf=conf, device="cpu", verbose=False)[0].boxes)
+            cand_ms.append(1000 * (time.perf_counter() - started))
+
+        ref_total += len(ref)
+        cand_total += len(cand)
+        matches += match_detections(ref, cand, iou_threshold)
+
+    return {
+        "images": len(images),
+        "reference_detections": ref_total,
+        "candidate_detections": cand_total,
+        "recall": round(len(matches) / ref_total, 4) if ref_total else 1.0,
+        "precision": round(len(matches) / cand_total, 4) if cand_total else 1.0,
+        "mean_iou": round(float(np.mean([m[0] for m in matches])), 4) if matches else None,
+        "mean_conf_diff": round(float(np.mean([m[1] for m in matches])), 4) if matches else None,
+        "reference_ms_p50": round(float(np.median(ref_ms)), 2) if ref_ms else None,
+        "candidate_ms_p50": round(float(np.median(cand_ms)), 2) if cand_ms else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export YOLO weights to CPU runtimes and check parity")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("--weights", default=str(Path(__file__).resolve().parent / "models" / "best.pt"))
+    parser.add_argument("--backend", choices=BACKENDS[1:], required=True)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--int8", action="store_true", help="INT8 post-training quantization")
+    parser.add_argument("--calibration", help="Folder of calibration images for --int8")
+    parser.add_argument("--images", help="Folder of images for the parity check")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Parity fails below this recall")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export_model(args.weights, args.backend, args.imgsz, args.int8, args.calibration)
+        return 0
+
+    if not args.images:
+        parser.error("parity needs --images")
+    images = list_images(args.images)
+    reference = load_model(args.weights, "pytorch")
+    candidate = load_model(args.weights, args.backend, args.imgsz, args.int8, args.calibration)
+    report = compare_backends(reference, candidate, images)
+    print(json.dumps(report, indent=2))
+    return 0 if report["recall"] >= args.min_recall else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
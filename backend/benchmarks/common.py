@@ -0,0 +1,152 @@
+"""
+Shared helpers for the benchmark scripts: test images, timing statistics,
+JSON result files and regression comparison against a saved baseline.
+"""
+
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+REPO_DIR = BACKEND_DIR.parent
+ITEMS_DIR = REPO_DIR / "frontend" / "public" / "assets" / "items"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Webcam frame, full-HD upload, 12 MP phone photo
+RESOLUTIONS = [(640, 480), (1920, 1080), (4032, 3024)]
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+def encode_jpeg(image: Image.Image, quality: int = 90) -> bytes:
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def synthetic_image(size: tuple, seed: int = 0) -> Image.Image:
+    """Deterministic noisy image with a few solid blobs, roughly photo-like to a JPEG encoder"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    base = rng.integers(80, 176, size=(h // 8 + 1, w // 8 + 1, 3), dtype=np.uint8)
+    image = Image.fromarray(base).resize(size, Image.Resampling.BILINEAR)
+    for _ in range(5):
+        x, y = int(rng.integers(0, w * 3 // 4)), int(rng.integers(0, h * 3 // 4))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        image.paste(color, (x, y, x + w // 6, y + h // 6))
+    return image
+
+
+def bench_images(max_bundled: int = 3) -> list:
+    """
+    ``(name, jpeg_bytes)`` test images: one synthetic image per resolution
+    plus up to ``max_bundled`` of the frontend item pictures scaled to each
+    resolution.
+    """
+    images = []
+    for w, h in RESOLUTIONS:
+        images.append((f"synthetic-{w}x{h}", encode_jpeg(synthetic_image((w, h)))))
+
+    for path in sorted(ITEMS_DIR.glob("*.png"))[:max_bundled]:
+        with Image.open(path) as item:
+            item = item.convert("RGB")
+            for w, h in RESOLUTIONS:
+                scaled = item.resize((w, h), Image.Resampling.BILINEAR)
+                images.append((f"{path.stem}-{w}x{h}", encode_jpeg(scaled)))
+    return images
+
+
+def summarize(samples_ms: list) -> dict:
+    """Latency statistics in milliseconds"""
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(pct(50), 3),
+        "p95_ms": round(pct(95), 3),
+        "p99_ms": round(pct(99), 3),
+        "min_ms": round(ordered[0], 3),
+    }
+
+
+def time_it(fn, repeat: int = 20, warmup: int = 2) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(1000 * (time.perf_counter() - started))
+    return summarize(samples)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def save_results(kind: str, results: dict, output=None) -> Path:
+    path = Path(output) if output else RESULTS_DIR / f"{kind}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"kind": kind, "meta": run_metadata(), "results": results}, indent=2))
+    print(f"💾 Results written to {path}")
+    return path
+
+
+def compare_results(current: dict, baseline_path, metric: str, tolerance: float) -> list:
+    """
+    Compare ``current`` results with a saved run. Returns a list of
+    regressions: entries whose ``metric`` got worse by more than ``tolerance``
+    (a fraction, 0.10 = 10 %).
+    """
+    baseline = json.loads(Path(baseline_path).read_text())["results"]
+    regressions = []
+    for name, stats in current.items():
+        old = baseline.get(name, {}).get(metric) if isinstance(baseline.get(name), dict) else None
+        new = stats.get(metric) if isinstance(stats, dict) else None
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        marker = "❌" if change > tolerance else "✅"
+        print(f"{marker} {name}: {metric} {old} -> {new} ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
@@ -0,0 +1,102 @@
+"""
+In-process load generator for the FastAPI app.
+
+    python benchmarks/load.py --concurrency 8 --requests 200    # from backend/
+    python benchmarks/load.py --compare results/load-baseline.json
+
+Drives the real app (executor, micro-batcher, model) through httpx's ASGI
+transport - no sockets, no separate server - with ``--concurrency`` clients
+posting test images to /detect. Reports throughput, p50/p95/p99 latency,
+status codes and the peak RSS of the process. The result cache is off
+unless ``--cache`` is given, so every request pays for inference.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from common import bench_images, compare_results, peak_rss_mb, save_results, summarize
+
+
+async def run_load(app, payloads: list, concurrency: int, total: int, endpoint: str) -> dict:
+    import httpx
+
+    latencies = []
+    statuses = {}
+    issued = 0
+
+    async def client_loop(client):
+        nonlocal issued
+        while issued < total:
+            name, data = payloads[issued % len(payloads)]
+            issued += 1
+            started = time.perf_counter()
+            response = await client.post(endpoint, files={"image": (f"{name}.jpg", data, "image/jpeg")})
+            latencies.append(1000 * (time.perf_counter() - started))
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2),
+        **summarize(latencies),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="In-process /detect load test")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--endpoint", default="/detect")
+    parser.add_argument("--bundled", type=int, default=3)
+    parser.add_argument("--cache", action="store_true", help="Leave the detection cache on")
+    parser.add_argument("--output")
+    parser.add_argument("--compare", help="Baseline result JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    if not args.cache:
+        os.environ["DETECT_CACHE_SIZE"] = "0"
+    import main as server
+
+    # The ASGI transport doesn't run the lifespan, so load the model here
+    server.initialize_model()
+    if server.model_status["state"] != "ready":
+        print(f"⚠️ Model not ready ({server.model_status['error']}), measuring the empty path")
+
+    payloads = bench_images(args.bundled)
+    results = {}
+    for concurrency in args.concurrency:
+        report = asyncio.run(
+            run_load(server.app, payloads, concurrency, args.requests, args.endpoint)
+        )
+        results[f"c{concurrency}"] = report
+        print(
+            f"c={concurrency:<3} {report['throughput_rps']:8.2f} req/s   "
+            f"p50 {report['p50_ms']:8.1f} ms   "
+            f"p95 {report['p95_ms']:8.1f} ms   "
+            f"p99 {report['p99_ms']:8.1f} ms   {report['statuses']}"
+        )
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    print(f"📈 Peak RSS: {results['peak_rss_mb']} MB")
+    save_results("load", results, args.output)
+
+    if args.compare:
+        regressions = compare_results(results, args.compare, "p95_ms", args.tolerance)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
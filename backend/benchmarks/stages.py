@@ -0,0 +1,139 @@
+"""
+Offline microbenchmarks for each stage of /detect.
+
+    python benchmarks/stages.py                      # from backend/
+    python benchmarks/stages.py --compare results/stages-baseline.json
+
+Stages, per test image (synthetic + frontend item pictures at webcam,
+full-HD and 12 MP resolutions):
+
+- decode_full:     the old Image.open(...).convert("RGB") full-resolution decode
+- decode:          preprocess.prepare_image (reduced decode + resize)
+- forward:         one model call on the prepared image (skipped without a model)
+- postprocess:     build_detection_response on the real result
+- serialize:       DetectionResponse -> JSON bytes the way /detect sends it
+                   (``model_dump_json``); serialize_compact / serialize_msgpack
+                   time ``format=compact`` / ``format=msgpack`` (``ResponseFormat.encode``)
+
+Post-processing and serialization are also timed on a synthetic crowded
+result (hundreds of boxes), which needs no model at all.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+import numpy as np
+
+from common import bench_images, compare_results, save_results, time_it
+
+
+class FakeBoxes:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.boxes = FakeBoxes(data)
+
+
+def crowded_result(boxes: int, classes: int, seed: int = 0) -> FakeResult:
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, 600, size=(boxes, 2))
+    wh = rng.uniform(10, 200, size=(boxes, 2))
+    conf = rng.uniform(0.05, 0.99, size=(boxes, 1))
+    cls = rng.integers(0, classes, size=(boxes, 1))
+    return FakeResult(np.hstack([xy, xy + wh, conf, cls]).astype(np.float32))
+
+
+def measure(server, table, args) -> dict:
+    from PIL import Image
+    from preprocess import prepare_image
+    from response_format import msgpack, negotiate
+
+    classes = len(table.names)
+    version = server.registry.active
+
+    encoders = {"serialize": lambda response: response.model_dump_json()}
+    formats = ["compact"] + (["msgpack"] if msgpack is not None else [])
+    for name in formats:
+        fmt = negotiate(name)
+        encoders[f"serialize_{name}"] = lambda response, fmt=fmt: fmt.encode(response.model_dump())
+
+    def time_serialize(label, response):
+        for stage, encode in encoders.items():
+            results[f"{stage}/{label}"] = time_it(lambda: encode(response), args.repeat)
+
+    results = {}
+    for name, data in bench_images(args.bundled):
+        print(f"⏱️ {name} ({len(data) // 1024} KB)", file=sys.stderr)
+        results[f"decode_full/{name}"] = time_it(
+            lambda: Image.open(io.BytesIO(data)).convert("RGB"), args.repeat
+        )
+        results[f"decode/{name}"] = time_it(
+            lambda: prepare_image(data, server.MODEL_INPUT_SIZE), args.repeat
+        )
+
+        if version is None:
+            continue
+        prepared = prepare_image(data, server.MODEL_INPUT_SIZE)
+        results[f"forward/{name}"] = time_it(
+            lambda: version.model(prepared.image, device="cpu", verbose=False), args.repeat
+        )
+        result = version.model(prepared.image, device="cpu", verbose=False)[0]
+        results[f"postprocess/{name}"] = time_it(
+            lambda: server.build_detection_response(result, prepared, table), args.repeat
+        )
+        response = server.build_detection_response(result, prepared, table)
+        time_serialize(name, response)
+
+    for boxes in (10, 100, 300):
+        result = crowded_result(boxes, classes)
+        results[f"postprocess/crowded-{boxes}"] = time_it(
+            lambda: server.build_detection_response(result, table=table), args.repeat
+        )
+    response = server.build_detection_response(crowded_result(300, classes), table=table)
+    time_serialize("crowded-300", response)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage /detect microbenchmarks")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--bundled", type=int, default=3, help="Frontend item images to include")
+    parser.add_argument("--no-model", action="store_true", help="Skip model forward/postprocess")
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/)")
+    parser.add_argument("--compare", help="Baseline result JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    import main as server
+    from postprocess import ClassTable
+
+    if not args.no_model:
+        server.initialize_model()
+    if server.registry.active is not None:
+        table = server.registry.active.table
+    else:
+        # No model: post-processing still benchmarks fine against the default classes
+        table = ClassTable(server.WASTE_CATEGORIES, server.RECYCLING_TIPS)
+
+    # The pipeline prints per request; keep that out of the timings
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = measure(server, table, args)
+
+    for name, stats in results.items():
+        print(f"{name:45s} p50 {stats['p50_ms']:9.3f} ms   p95 {stats['p95_ms']:9.3f} ms")
+    save_results("stages", results, args.output)
+
+    if args.compare:
+        regressions = compare_results(results, args.compare, "p50_ms", args.tolerance)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
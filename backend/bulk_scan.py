@@ -0,0 +1,248 @@
+"""
+Offline bulk re-classification of photo archives.
+
+    python bulk_scan.py photos/ --output results.jsonl
+    python bulk_scan.py audit-2024.zip --output results.parquet --batch-size 16
+
+Uses the same model, bin mapping and response format as ``/detect``
+(``main.detect_images``). Pipeline:
+
+1. a process pool reads and decodes images (``preprocess.prepare_image``)
+   - one process per core by default, ahead of the model by a bounded window;
+2. the main process takes decoded images in input order, ``--batch-size``
+   at a time, and runs one forward pass per batch while the pool keeps
+   decoding;
+3. every result is appended to a JSONL journal and flushed per batch.
+
+The journal doubles as the checkpoint: rerunning the same command skips
+every image already in it, so a crashed or interrupted run resumes where it
+stopped. Each row has a ``status``: ``ok``, ``unreadable`` (bad image, not
+retried) or ``inference_error`` (the model pass failed - ``error`` says
+why). Failed rows are dropped from the journal on the next run and their
+images scanned again. For ``.parquet`` output the journal (``<output>.parquet.jsonl``) is
+converted once all images are done (needs ``pyarrow``).
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from preprocess import prepare_image
+from uploads import is_image_name
+
+PROGRESS_EVERY = 5.0  # seconds between progress lines
+
+# Row status that isn't a result: the image is scanned again on resume
+RETRY_STATUS = "inference_error"
+
+
+def list_sources(source: Path) -> list:
+    """Image names in a directory (relative paths) or ZIP archive (member names), sorted"""
+    if source.is_dir():
+        return sorted(
+            path.relative_to(source).as_posix()
+            for path in source.rglob("*")
+            if path.is_file() and is_image_name(path.relative_to(source).as_posix())
+        )
+    with zipfile.ZipFile(source) as archive:
+        return sorted(
+            info.filename
+            for info in archive.infolist()
+            if not info.is_dir() and is_image_name(info.filename)
+        )
+
+
+# One open ZipFile per decoder process
+_archives = {}
+
+
+def decode_job(source: str, name: str, target_size: int, is_zip: bool):
+    """Runs in a pool process: ``(name, PreparedImage or None, error)``"""
+    try:
+        if is_zip:
+            archive = _archives.get(source)
+            if archive is None:
+                archive = _archives[source] = zipfile.ZipFile(source)
+            data = archive.read(name)
+        else:
+            data = (Path(source) / name).read_bytes()
+        return name, prepare_image(data, target_size), None
+    except Exception as e:
+        return name, None, str(e)
+
+
+def load_checkpoint(journal: Path) -> set:
+    """
+    Names already recorded in ``journal``. A torn last line (crash mid-write)
+    is cut off so appending continues on a clean line boundary, and rows of
+    failed model passes are dropped so their images are scanned again.
+    """
+    if not journal.exists():
+        return set()
+    with open(journal, "rb") as f:
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+
+    done, kept = set(), []
+    for line in data[:end].splitlines():
+        try:
+            row = json.loads(line)
+            name = row["filename"]
+        except (ValueError, KeyError):
+            continue
+        if row.get("status") == RETRY_STATUS:
+            continue
+        done.add(name)
+        kept.append(line + b"\n")
+
+    if sum(map(len, kept)) < len(data):
+        # Rewrite via a temporary file: a crash here must not lose finished rows
+        rewritten = journal.with_name(journal.name + ".tmp")
+        rewritten.write_bytes(b"".join(kept))
+        os.replace(rewritten, journal)
+    return done
+
+
+def decode_pipeline(pool, source: Path, names: list, target_size: int, batch_size: int, window: int):
+    """
+    Yield batches of decoded ``(name, prepared, error)`` in input order.
+    At most ``window`` decodes are in flight; the window is refilled before
+    each batch is handed to the model so the pool never idles on it.
+    """
+    pending = iter(names)
+    inflight = deque()
+    is_zip = not source.is_dir()
+
+    def fill():
+        while len(inflight) < window:
+            name = next(pending, None)
+            if name is None:
+                return
+            inflight.append(pool.submit(decode_job, str(source), name, target_size, is_zip))
+
+    fill()
+    while inflight:
+        batch = [inflight.popleft().result() for _ in range(min(batch_size, len(inflight)))]
+        fill()
+        yield batch
+
+
+def write_parquet(journal: Path, output: Path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with open(journal, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    pq.write_table(pa.Table.from_pylist(rows), output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-classify a directory or ZIP of waste photos")
+    parser.add_argument("source", help="Directory of images or a .zip archive")
+    parser.add_argument("--output", required=True, help="Results file: .jsonl or .parquet")
+    parser.add_argument("--batch-size", type=int, default=8, help="Images per model call")
+    parser.add_argument("--decoders", type=int, default=os.cpu_count() or 1, help="Decoder processes")
+    parser.add_argument("--torch-threads", type=int, help="PyTorch intra-op threads (default: torch's choice)")
+    args = parser.parse_args(argv)
+
+    source = Path(args.source)
+    output = Path(args.output)
+    if not source.exists():
+        parser.error(f"{source} does not exist")
+    if output.suffix == ".parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("Parquet output needs pyarrow (pip install pyarrow)")
+        journal = output.with_name(output.name + ".jsonl")
+    elif output.suffix == ".jsonl":
+        journal = output
+    else:
+        parser.error("--output must end in .jsonl or .parquet")
+
+    names = list_sources(source)
+    done = load_checkpoint(journal)
+    todo = [name for name in names if name not in done]
+    print(f"📂 {len(names)} images in {source}, {len(done)} already done, {len(todo)} to scan")
+
+    # Same model and post-processing as the API, without the result cache
+    os.environ["DETECT_CACHE_SIZE"] = "0"
+    import main as server
+
+    if args.torch_threads:
+        from serve import set_torch_threads
+
+        set_torch_threads(args.torch_threads)
+    server.initialize_model()
+    if server.model_status["state"] != "ready":
+        print(f"❌ Model not ready: {server.model_status['error']}")
+        return 1
+
+    # forkserver/spawn: decoders start clean instead of inheriting the model and torch's threads
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    window = max(2 * args.batch_size, 4 * args.decoders)
+
+    scanned = unreadable = errors = 0
+    started = last_report = time.perf_counter()
+    with ProcessPoolExecutor(args.decoders, mp_context=context) as pool, open(
+        journal, "a", encoding="utf-8"
+    ) as out:
+        batches = decode_pipeline(
+            pool, source, todo, server.MODEL_INPUT_SIZE, args.batch_size, window
+        )
+        for batch in batches:
+            failure = None
+            try:
+                responses = server.detect_images(
+                    [prepared for _, prepared, _ in batch], raise_errors=True
+                )
+            except Exception as e:
+                responses, failure = [None] * len(batch), f"Inference failed: {e}"
+            for (name, prepared, error), response in zip(batch, responses):
+                if prepared is None:
+                    status, items = "unreadable", []
+                    unreadable += 1
+                elif response is None:
+                    status, items, error = RETRY_STATUS, [], failure
+                    errors += 1
+                else:
+                    status, items = "ok", response.model_dump()["items"]
+                row = {"filename": name, "status": status, "items": items, "error": error}
+                out.write(json.dumps(row) + "\n")
+            out.flush()
+            scanned += len(batch)
+
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_EVERY or scanned == len(todo):
+                rate = scanned / (now - started)
+                eta = (len(todo) - scanned) / rate if rate else 0
+                print(f"⏱️ {scanned}/{len(todo)} images, {rate:.1f} img/s, ETA {eta:.0f} s")
+                last_report = now
+
+    elapsed = time.perf_counter() - started
+    if todo:
+        print(
+            f"✅ Scanned {scanned} images in {elapsed:.1f} s "
+            f"({scanned / elapsed:.1f} img/s, {unreadable} unreadable)"
+        )
+    if errors:
+        # Keep the journal: rerunning retries exactly the failed images
+        print(f"❌ Inference failed for {errors} images, rerun the same command to retry them")
+        return 1
+    if output.suffix == ".parquet":
+        write_parquet(journal, output)
+        journal.unlink()
+        print(f"💾 Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
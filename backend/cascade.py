@@ -0,0 +1,128 @@
+"""
+Two-stage detection and load-aware degradation.
+
+Most photos hold one obvious item, and a cheap pass - a smaller model, or
+the same model at a lower input size - is confident about it. The cascade
+runs that cheap pass first and only sends an image through the full model
+when ``needs_escalation`` says the cheap answer isn't good enough: no waste
+item found, or the best one below a confidence bar.
+
+``LatencySLO`` watches how long requests wait for an inference worker. When
+the recent p95 wait goes over the objective the server is *degraded*: every
+image gets the cheap pass only (no escalation), and responses say so. It
+recovers once waits are comfortably back under the objective, with a
+minimum hold so it doesn't flap on every other batch.
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+def needs_escalation(data: np.ndarray, table, conf_threshold: float, escalate_below: float) -> bool:
+    """
+    Whether a cheap-pass ``(n, 6)`` result should go to the full model: no
+    non-ignored class at ``conf_threshold``, or the best one under
+    ``escalate_below``.
+    """
+    cls = data[:, 5].astype(np.intp)
+    known = (cls >= 0) & (cls < len(table.ignored))
+    keep = known & (data[:, 4] >= conf_threshold)
+    keep[keep] = ~table.ignored[cls[keep]]
+    if not keep.any():
+        return True
+    return bool(data[keep, 4].max() < escalate_below)
+
+
+class LatencySLO:
+    """
+    Rolling queue-wait percentile against a latency objective.
+
+    Args:
+        slo_ms: Objective for the ``quantile`` wait; 0 disables degrading.
+        window_s: Only waits observed in the last ``window_s`` seconds count.
+        quantile: Which percentile of the window is compared to the objective.
+        recover: Degraded mode ends once the percentile is under
+            ``recover * slo_ms``...
+        hold_s: ...and has been degraded for at least ``hold_s`` seconds.
+    """
+
+    def __init__(
+        self,
+        slo_ms: float,
+        window_s: float = 10.0,
+        quantile: float = 0.95,
+        recover: float = 0.5,
+        hold_s: float = 5.0,
+    ):
+        self.slo_ms = slo_ms
+        self.window_s = window_s
+        self.quantile = quantile
+        self.recover = recover
+        self.hold_s = hold_s
+
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=2048)  # (timestamp, wait_ms)
+        self._degraded_since = None
+        self._transitions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.slo_ms > 0
+
+    @property
+    def degraded(self) -> bool:
+        """Current state; also lets an idle server recover without new observations"""
+        if self._degraded_since is None:
+            return False
+        with self._lock:
+            self._evaluate(time.monotonic())
+            return self._degraded_since is not None
+
+    def _percentile(self, now: float) -> float:
+        while self._waits and self._waits[0][0] < now - self.window_s:
+            self._waits.popleft()
+        if not self._waits:
+            return 0.0
+        return float(np.quantile([wait for _, wait in self._waits], self.quantile))
+
+    def _evaluate(self, now: float) -> bool:
+        current = self._percentile(now)
+        if self._degraded_since is None:
+            if current <= self.slo_ms:
+                return False
+            self._degraded_since = now
+        else:
+            if current >= self.recover * self.slo_ms or now - self._degraded_since < self.hold_s:
+                return False
+            self._degraded_since = None
+        self._transitions += 1
+        return True
+
+    def observe(self, wait_seconds: float, now: float = None) -> bool:
+        """
+        Record one request's queue wait and re-evaluate. Returns True when
+        this observation switched the state (into or out of degraded mode).
+        """
+        if not self.enabled:
+            return False
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._waits.append((now, 1000 * wait_seconds))
+            return self._evaluate(now)
+
+    def stats(self) -> dict:
+        degraded = self.degraded
+        now = time.monotonic()
+        with self._lock:
+            current = self._percentile(now)
+            since = self._degraded_since
+        return {
+            "slo_ms": self.slo_ms,
+            f"wait_ms_p{round(100 * self.quantile)}": round(current, 2),
+            "degraded": degraded,
+            "degraded_for_s": round(now - since, 1) if since is not None else 0.0,
+            "transitions": self._transitions,
+        }
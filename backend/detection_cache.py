@@ -0,0 +1,199 @@
+"""
+Content-addressed cache of detection results.
+
+Retries from the scan screen, demo images and repeated kiosk captures send
+the same picture over and over. Results are cached under a hash of the
+uploaded bytes and, in ``phash`` mode, additionally under a perceptual hash
+of the decoded image so near-identical frames (re-encoded, slightly noisy)
+also hit. A near-duplicate may have another resolution, so perceptual
+entries keep their boxes relative to the image size (``relative_boxes``)
+and are scaled onto each requesting image (``absolute_boxes``). Flat or
+dark frames get no perceptual key at all - their dHash bits are noise.
+
+Entries hold the serialized DetectionResponse JSON, are evicted LRU-first
+beyond ``max_entries`` and expire after ``ttl_seconds``. The cache is bound
+to a model fingerprint and empties itself when a different model is bound.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image
+
+CACHE_MODES = ("exact", "phash")
+
+
+def bytes_key(data: bytes) -> str:
+    """Exact key: hash of the raw upload"""
+    return "b:" + hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+PERCEPTUAL_PREFIX = "p:"
+
+# A dHash bit only counts when neighbouring pixels differ by at least
+# DHASH_MIN_DIFF gray levels; frames with fewer such bits aren't hashed
+DHASH_MIN_DIFF = 3
+DHASH_MIN_BITS = 16
+
+
+def perceptual_key(image: Image.Image):
+    """Near-duplicate key: 64-bit difference hash (dHash), or None for low-texture images"""
+    small = image.convert("L").resize((9, 8), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+    bits = decisive = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            left, right = pixels[offset + col], pixels[offset + col + 1]
+            bits = (bits << 1) | (left > right)
+            decisive += abs(left - right) >= DHASH_MIN_DIFF
+    if decisive < DHASH_MIN_BITS:
+        return None
+    return f"{PERCEPTUAL_PREFIX}{bits:016x}"
+
+
+def is_perceptual(key: str) -> bool:
+    return key.startswith(PERCEPTUAL_PREFIX)
+
+
+def map_boxes(response: dict, transform) -> dict:
+    """Copy of a response dict with ``transform`` applied to every item's bbox"""
+    items = [{**item, "bbox": transform(item["bbox"])} for item in response["items"]]
+    return {**response, "items": items}
+
+
+def relative_boxes(response: dict, size: tuple) -> dict:
+    """Response dict with every bbox as fractions of the ``(w, h)`` image size"""
+    w, h = size
+    return map_boxes(
+        response, lambda b: {"x": b["x"] / w, "y": b["y"] / h, "w": b["w"] / w, "h": b["h"] / h}
+    )
+
+
+def absolute_boxes(response: dict, size: tuple) -> dict:
+    """Inverse of ``relative_boxes`` for an image of ``(w, h)`` pixels"""
+    w, h = size
+    return map_boxes(
+        response,
+        lambda b: {"x": round(b["x"] * w), "y": round(b["y"] * h), "w": round(b["w"] * w), "h": round(b["h"] * h)},
+    )
+
+
+def model_fingerprint(model_path) -> str:
+    """Identify a weights file by name and content checksum"""
+    path = Path(model_path)
+    if not path.is_file():
+        return path.name
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return f"{path.name}:{digest.hexdigest()[:16]}"
+
+
+class DetectionCache:
+    """
+    Thread-safe LRU + TTL cache of serialized detection responses.
+
+    Args:
+        max_entries: Capacity; 0 disables the cache.
+        ttl_seconds: Lifetime of an entry.
+        mode: "exact" (byte hash only) or "phash" (byte hash + perceptual hash).
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 600, mode: str = "exact"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl_seconds
+        self.mode = mode
+        self.model_id = None
+
+        self._entries = OrderedDict()  # key -> (expires_at, payload)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def perceptual(self) -> bool:
+        return self.enabled and self.mode == "phash"
+
+    def bind_model(self, model_id):
+        """Attach the cache to a model, dropping everything cached for another one"""
+        with self._lock:
+            if model_id == self.model_id:
+                return
+            if self._entries:
+                self._invalidations += 1
+            self._entries.clear()
+            self.model_id = model_id
+
+    def get(self, key: str):
+        """Cached JSON payload for ``key``, or None"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, payload = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return payload
+
+    def put(self, key: str, payload: str, model_id=None):
+        """
+        Store ``payload``. With ``model_id``, it's only stored if the cache is
+        still bound to that model - a request finishing on a swapped-out
+        model must not leave its result behind.
+        """
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if model_id is not None and model_id != self.model_id:
+                return
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "mode": self.mode,
+                "model": self.model_id,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
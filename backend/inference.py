@@ -0,0 +1,243 @@
+"""
+Inference executor for the detection endpoints.
+
+YOLO inference is synchronous and CPU-bound, so running it inside an
+``async def`` route stalls the whole event loop (``/health`` and ``/chat``
+included). ``InferenceExecutor`` runs model work on a small dedicated thread
+pool and bounds how many jobs may wait for it, so an overloaded server
+rejects quickly instead of piling up latency.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue is at capacity."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Thread pool with a bounded waiting queue.
+
+    Args:
+        workers: Number of threads running inference concurrently.
+        max_queue: Number of jobs allowed to wait for a free worker.
+        retry_after: Seconds suggested to rejected clients.
+    """
+
+    def __init__(self, workers: int = 1, max_queue: int = 8, retry_after: int = 2):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="inference"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0  # queued + running
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._waits = deque(maxlen=512)  # recent queue wait times (seconds)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on the pool and await its result."""
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise InferenceQueueFull(self.retry_after)
+            self._pending += 1
+
+        enqueued_at = time.perf_counter()
+
+        def job():
+            wait = time.perf_counter() - enqueued_at
+            with self._lock:
+                self._running += 1
+                self._waits.append(wait)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        future = self._pool.submit(job)
+        # Fires on completion *and* on cancellation before the job started,
+        # so an abandoned request never leaks a queue slot.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth and recent wait times."""
+        with self._lock:
+            waits = list(self._waits)
+            pending = self._pending
+            running = self._running
+            completed = self._completed
+            rejected = self._rejected
+
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": running,
+            "queue_depth": max(0, pending - running),
+            "completed": completed,
+            "rejected": rejected,
+            "wait_ms_avg": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+            "wait_ms_max": round(1000 * max(waits), 2) if waits else 0.0,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single-image requests into batched forward passes.
+
+    Callers ``await submit(item)``. A background task takes the first waiting
+    item, keeps collecting until ``max_batch_size`` items or ``max_wait_ms``
+    have passed, then runs ``batch_fn(items)`` on the executor. ``batch_fn``
+    must return one result per item, in order. At most ``executor.workers``
+    batches are in flight; while they run, new items pile up and form the
+    next (larger) batch.
+
+    Args:
+        executor: InferenceExecutor the batches run on.
+        batch_fn: Blocking callable mapping a list of items to a list of results.
+        max_batch_size: Largest batch handed to ``batch_fn``.
+        max_wait_ms: How long the first item of a batch waits for company.
+        max_pending: Items allowed to wait before submit() rejects.
+        on_wait: Called (on the worker thread) with each item's wait in
+            seconds - from submit() until its batch starts running.
+    """
+
+    def __init__(
+        self,
+        executor: InferenceExecutor,
+        batch_fn,
+        max_batch_size: int = 4,
+        max_wait_ms: float = 10,
+        max_pending: int = 32,
+        on_wait=None,
+    ):
+        self.executor = executor
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_pending = max(1, max_pending)
+        self.on_wait = on_wait
+
+        self._queue = None
+        self._task = None
+        self._inflight = set()  # strong refs so dispatch tasks aren't GC'd
+        self._pending = 0
+        self._batches = 0
+        self._items = 0
+        self._rejected = 0
+        self._waits = deque(maxlen=512)  # recent submit-to-start times (seconds)
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._collect())
+
+    async def submit(self, item):
+        """Queue ``item`` for the next batch and await its own result."""
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise InferenceQueueFull(self.executor.retry_after)
+
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._pending += 1
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        try:
+            return await future
+        finally:
+            self._pending -= 1
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.executor.workers)
+        while True:
+            await slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                getter = loop.create_task(self._queue.get())
+                done, _ = await asyncio.wait({getter}, timeout=timeout)
+                if not done:
+                    # Queue.get() is cancellation safe: nothing is lost.
+                    getter.cancel()
+                    break
+                batch.append(getter.result())
+
+            task = loop.create_task(self._dispatch(batch, slots))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch, slots):
+        # Skip callers that gave up while waiting for the batch to form.
+        batch = [entry for entry in batch if not entry[1].done()]
+        submitted = [submitted_at for _, _, submitted_at in batch]
+
+        def run(items):
+            started = time.perf_counter()
+            for submitted_at in submitted:
+                self._waits.append(started - submitted_at)
+                if self.on_wait:
+                    self.on_wait(started - submitted_at)
+            return self.batch_fn(items)
+
+        try:
+            if not batch:
+                return
+            self._batches += 1
+            self._items += len(batch)
+            results = await self.executor.run(run, [item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            slots.release()
+
+    def stats(self) -> dict:
+        waits = list(self._waits)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": self._pending,
+            "batches": self._batches,
+            "avg_batch_size": round(self._items / self._batches, 2)
+            if self._batches
+            else 0.0,
+            "rejected": self._rejected,
+            "wait_ms_avg": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+            "wait_ms_max": round(1000 * max(waits), 2) if waits else 0.0,
+        }
@@ -0,0 +1,394 @@
+"""
+Local knowledge retrieval for /chat.
+
+Everything the app knows about waste - the backend's RECYCLING_TIPS, the
+demo item metadata and the frontend's item catalogue
+(``frontend/src/data/wasteData.js``) - is indexed once at startup:
+
+- a word-level keyword trie ("battery", "plastic bag", "second life"...)
+  that finds item and bin names on whole-word boundaries, so "scan" no
+  longer matches "can";
+- a BM25 inverted index over every document for free-text questions that
+  name no known item.
+
+Answers for the same normalized query are memoized in an LRU cache.
+"""
+
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+from postprocess import BIN_BY_CLASS_NAME, FALLBACK_BIN
+
+logger = logging.getLogger(__name__)
+
+# Bin for each wasteData.js item; anything not listed is recyclable
+CATALOGUE_BINS = {
+    "cup": "Landfill",  # ceramic is not accepted with glass
+    "banana": "Organic",
+    "apple": "Organic",
+    "coffee": "Organic",
+    "egg": "Organic",
+    "pizza": "Organic",  # greasy box half goes to compost
+    "phone": "Hazardous",
+    "laptop": "Hazardous",
+    "battery": "Hazardous",
+    "styrofoam": "Landfill",
+    "plastic bag": "Landfill",  # store drop-off only, never curbside
+    "polythene": "Landfill",
+}
+
+# Extra names people use for catalogue items
+CATALOGUE_ALIASES = {
+    "bottle": ["plastic bottle", "water bottle", "pet bottle"],
+    "cup": ["mug", "ceramic", "plate"],
+    "book": ["notebook", "newspaper", "magazine"],
+    "paper": ["cardboard", "envelope"],
+    "can": ["soda can", "drink can", "aluminum can", "aluminium can", "aluminum", "aluminium"],
+    "tin": ["tin can", "steel can", "steel"],
+    "jar": ["glass jar"],
+    "banana": ["banana peel", "peel"],
+    "apple": ["apple core", "fruit"],
+    "coffee": ["coffee grounds", "grounds", "coffee filter"],
+    "egg": ["eggshell", "egg shell"],
+    "phone": ["cell phone", "smartphone", "mobile phone", "charger"],
+    "laptop": ["computer", "tablet"],
+    "battery": ["lithium", "aa battery"],
+    "pizza": ["pizza box", "greasy box"],
+    "styrofoam": ["polystyrene", "foam", "eps"],
+    "plastic bag": ["carrier bag", "shopping bag", "grocery bag"],
+    "polythene": ["cling film", "plastic wrap", "bubble wrap", "soft plastic"],
+}
+
+# Words naming a bin rather than an item (BIN_ALIASES covers the class names)
+BIN_KEYWORDS = {
+    "Recycle": ["recycling bin", "blue bin", "repurpose", "donate", "second life"],
+    "Organic": ["food", "food scrap", "garden", "green bin", "biodegradable", "leftover"],
+    "Hazardous": ["e-waste", "electronic", "electronics", "chemical", "paint", "medicine"],
+    "Landfill": ["landfill", "trash", "garbage", "rubbish", "general waste"],
+}
+
+# Never keywords on their own: "can I recycle...?" is not about cans
+AMBIGUOUS_KEYWORDS = {"can", "tin", "glass", "metal", "paper", "plastic"}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "be", "can", "do", "does", "for", "go", "goes", "how",
+    "i", "if", "in", "into", "is", "it", "its", "me", "my", "of", "on", "or", "put",
+    "should", "the", "this", "to", "what", "where", "which", "with", "you", "your",
+    # too generic to pick a document on their own
+    "about", "away", "bin", "dispose", "item", "old", "tell", "thing", "throw", "waste",
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    return TOKEN_RE.findall(text.lower())
+
+
+def stem(token: str) -> str:
+    """Crude plural folding - enough for "batteries"/"battery", "bottles"/"bottle"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("sses", "xes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us")):
+        return token[:-1]
+    return token
+
+
+def index_terms(text: str) -> list:
+    return [stem(token) for token in tokenize(text) if token not in STOPWORDS]
+
+
+def plural_forms(phrase: str) -> list:
+    """The phrase plus its plural (last word pluralized)"""
+    head, _, last = phrase.rpartition(" ")
+    if last.endswith("y") and last[-2:-1] not in "aeiou":
+        plural = last[:-1] + "ies"
+    elif last.endswith(("s", "x", "ch", "sh")):
+        plural = last + "es"
+    else:
+        plural = last + "s"
+    return [phrase, f"{head} {plural}".strip()]
+
+
+# ─────────────────────────────────────────────────────────────
+# Documents
+# ─────────────────────────────────────────────────────────────
+
+
+@dataclass
+class Document:
+    """An item (``subject`` set) or a whole bin (``subject`` None)"""
+
+    bin: str
+    subject: str = None
+    tips: list = field(default_factory=list)
+    facts: list = field(default_factory=list)
+
+    def text(self) -> str:
+        # The name counts three times so "battery" ranks the battery entry first
+        name = self.subject or f"{self.bin} waste"
+        return " ".join([name] * 3 + self.tips + self.facts)
+
+
+JS_SECTION_RE = re.compile(r"export\s+const\s+(\w+)\s*=")
+JS_ENTRY_RE = re.compile(r"^\s*'([^']+)':\s*\{(.*?)^\s*\},?\s*$", re.M | re.S)
+JS_FIELD_RE = re.compile(r'(\w+):\s*"((?:[^"\\]|\\.)*)"')
+JS_TIPS_RE = re.compile(r"tips:\s*\[(.*?)\]", re.S)
+JS_STRING_RE = re.compile(r'"((?:[^"\\]|\\.)*)"')
+FACT_FIELDS = ("fun_fact", "transformation", "impact")
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", r"\1", value)
+
+
+def parse_catalogue(source: str) -> dict:
+    """
+    Read the object literals of ``wasteData.js`` without a JS engine.
+
+    Returns ``{const_name: {key: {"tips": [...], "fun_fact": ..., ...}}}``.
+    """
+    parts = JS_SECTION_RE.split(source)
+    sections = {}
+    for name, body in zip(parts[1::2], parts[2::2]):
+        entries = {}
+        for key, entry in JS_ENTRY_RE.findall(body):
+            fields = {k: _unescape(v) for k, v in JS_FIELD_RE.findall(entry)}
+            tips = JS_TIPS_RE.search(entry)
+            fields["tips"] = (
+                [_unescape(tip) for tip in JS_STRING_RE.findall(tips.group(1))] if tips else []
+            )
+            entries[key] = fields
+        sections[name] = entries
+    return sections
+
+
+def catalogue_documents(path) -> tuple:
+    """``(item docs, bin docs)`` from wasteData.js; empty if the file is missing"""
+    path = Path(path)
+    if not path.exists():
+        logger.warning(f"Chat catalogue not found at {path}, answering from backend tips only")
+        return [], []
+
+    sections = parse_catalogue(path.read_text(encoding="utf-8"))
+    items = [
+        Document(
+            bin=CATALOGUE_BINS.get(key, "Recycle"),
+            subject=key,
+            tips=entry["tips"],
+            facts=[entry[f] for f in FACT_FIELDS if f in entry],
+        )
+        for key, entry in sections.get("WASTE_KNOWLEDGE", {}).items()
+    ]
+    bins = [
+        Document(bin=key, tips=entry["tips"], facts=[entry[f] for f in FACT_FIELDS if f in entry])
+        for key, entry in sections.get("DEFAULT_KNOWLEDGE", {}).items()
+    ]
+    return items, bins
+
+
+# ─────────────────────────────────────────────────────────────
+# Index
+# ─────────────────────────────────────────────────────────────
+
+
+class KeywordMatcher:
+    """Token trie walked from every word of the query: whole-word, multi-word keywords"""
+
+    def __init__(self):
+        self._root = {}
+        self.size = 0
+
+    def add(self, phrase: str, value):
+        """Register ``phrase`` and its plural; the first value added for a phrase wins"""
+        for form in plural_forms(phrase.lower()):
+            node = self._root
+            for token in tokenize(form):
+                node = node.setdefault(token, {})
+            if None not in node:
+                node[None] = value
+                self.size += 1
+
+    def find(self, tokens: list) -> list:
+        """``(start, length, value)`` for every keyword occurrence"""
+        matches = []
+        for start in range(len(tokens)):
+            node = self._root
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                if None in node:
+                    matches.append((start, end - start + 1, node[None]))
+        return matches
+
+
+class BM25Index:
+    def __init__(self, texts: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.postings = {}  # term -> [(doc, tf), ...]
+        lengths = []
+        for doc, text in enumerate(texts):
+            terms = index_terms(text)
+            lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings.setdefault(term, []).append((doc, tf))
+
+        average = sum(lengths) / len(lengths) if lengths else 1.0
+        self.norms = [k1 * (1 - b + b * length / average) for length in lengths]
+        count = len(texts)
+        self.idf = {
+            term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def scores(self, terms: list) -> dict:
+        scores = {}
+        for term in set(terms):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self.postings[term]:
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.norms[doc])
+        return scores
+
+
+class KnowledgeBase:
+    """
+    Answers waste questions from local documents.
+
+    Args:
+        documents: Item and bin ``Document``s; bin documents for the same bin
+            are merged.
+        cache_size: Normalized queries whose answers are memoized.
+    """
+
+    def __init__(self, documents: list, cache_size: int = 1024):
+        self.documents = []
+        self.bin_documents = {}
+        for doc in documents:
+            if doc.subject is None and doc.bin in self.bin_documents:
+                merged = self.bin_documents[doc.bin]
+                merged.tips.extend(doc.tips)
+                merged.facts.extend(doc.facts)
+                continue
+            self.documents.append(doc)
+            if doc.subject is None:
+                self.bin_documents[doc.bin] = doc
+
+        self.index = BM25Index([doc.text() for doc in self.documents])
+        self.keywords = KeywordMatcher()
+        for i, doc in enumerate(self.documents):
+            if doc.subject and doc.subject not in AMBIGUOUS_KEYWORDS:
+                self.keywords.add(doc.subject, ("item", i))
+            for alias in CATALOGUE_ALIASES.get(doc.subject, []):
+                self.keywords.add(alias, ("item", i))
+        for class_name, bin_name in BIN_BY_CLASS_NAME.items():
+            self.keywords.add(class_name, ("bin", bin_name))
+        for bin_name, words in BIN_KEYWORDS.items():
+            for word in words:
+                self.keywords.add(word, ("bin", bin_name))
+
+        self._answer = lru_cache(maxsize=cache_size)(self._lookup) if cache_size else self._lookup
+
+    @classmethod
+    def from_sources(cls, tips: dict, demo_items: list, catalogue_path, cache_size: int = 1024):
+        """
+        Build from RECYCLING_TIPS (``{class_name: tip}``), demo DetectedItems
+        (as dicts) and the frontend catalogue file.
+        """
+        items, bins = catalogue_documents(catalogue_path)
+        documents = items + bins
+        for class_name, tip in tips.items():
+            documents.append(Document(bin=BIN_BY_CLASS_NAME.get(class_name, FALLBACK_BIN), tips=[tip]))
+        for item in demo_items:
+            documents.append(
+                Document(
+                    bin=BIN_BY_CLASS_NAME.get(item["bin"], FALLBACK_BIN),
+                    subject=item["itemType"].lower(),
+                    facts=[item["metadata"][f] for f in FACT_FIELDS if f in item["metadata"]],
+                )
+            )
+        return cls(documents, cache_size)
+
+    def answer(self, query: str) -> tuple:
+        """``(response text, bin)`` for a free-text question"""
+        return self._answer(" ".join(tokenize(query)))
+
+    def stats(self) -> dict:
+        info = self._answer.cache_info() if hasattr(self._answer, "cache_info") else None
+        return {
+            "documents": len(self.documents),
+            "keywords": self.keywords.size,
+            "terms": len(self.index.postings),
+            "cache_hits": info.hits if info else 0,
+            "cache_misses": info.misses if info else 0,
+        }
+
+    def _lookup(self, normalized: str) -> tuple:
+        tokens = normalized.split()
+        terms = [stem(token) for token in tokens if token not in STOPWORDS]
+
+        item, bin_name = self._match_keywords(tokens)
+        if item is not None:
+            doc = self.documents[item]
+        else:
+            scores = self.index.scores(terms)
+            if bin_name is not None:
+                # "what goes in compost?" -> the bin's own advice, or its best item
+                doc = self.bin_documents.get(bin_name) or self._best(scores, bin_name)
+            else:
+                doc = self._best(scores)
+
+        if doc is None:
+            return (
+                "I couldn't find that in my waste guide. Try naming the item, "
+                "e.g. 'plastic bottle', 'battery' or 'pizza box'.",
+                bin_name or FALLBACK_BIN,
+            )
+        return self._compose(doc, terms), doc.bin
+
+    def _match_keywords(self, tokens: list) -> tuple:
+        """Longest item keyword wins; otherwise the longest bin keyword"""
+        best_item = best_bin = None
+        for _start, length, (kind, value) in self.keywords.find(tokens):
+            if kind == "item" and (best_item is None or length > best_item[0]):
+                best_item = (length, value)
+            elif kind == "bin" and (best_bin is None or length > best_bin[0]):
+                best_bin = (length, value)
+        return (best_item[1] if best_item else None), (best_bin[1] if best_bin else None)
+
+    def _best(self, scores: dict, bin_name: str = None):
+        candidates = [
+            (score, -doc) for doc, score in scores.items()
+            if bin_name is None or self.documents[doc].bin == bin_name
+        ]
+        if not candidates:
+            return None
+        return self.documents[-max(candidates)[1]]
+
+    def _overlap(self, text: str, terms: set) -> float:
+        return sum(self.index.idf.get(term, 0.0) for term in set(index_terms(text)) & terms)
+
+    def _compose(self, doc: Document, terms: list) -> str:
+        terms = set(terms)
+        if doc.subject:
+            parts = [f"{doc.subject.capitalize()} goes in the {doc.bin} bin."]
+        else:
+            parts = [f"Use the {doc.bin} bin."]
+
+        if doc.tips:
+            # max() keeps the first of equal scores, and tips are listed most important first
+            parts.append(max(doc.tips, key=lambda tip: self._overlap(tip, terms)))
+        if doc.facts:
+            fact = max(doc.facts, key=lambda fact: self._overlap(fact, terms))
+            if not doc.tips or self._overlap(fact, terms) > 0:
+                parts.append(fact)
+        return " ".join(parts)
@@ -0,0 +1,67 @@
+"""
+Helpers for the live-scan WebSocket.
+
+A phone pointed at a bin streams frames far faster than YOLO can process
+them. ``LatestFrame`` keeps only the newest unprocessed frame (older ones
+are dropped, not queued), and ``frame_signature``/``frame_difference`` give
+a cheap "has the scene changed?" test on a tiny grayscale thumbnail so an
+unchanged scene reuses the previous detections instead of re-running YOLO.
+"""
+
+import asyncio
+
+import numpy as np
+from PIL import Image
+
+from preprocess import open_image
+
+SIGNATURE_SIZE = 32
+
+
+class LatestFrame:
+    """Single-slot mailbox: put() overwrites, get() waits for the newest frame"""
+
+    def __init__(self):
+        self._frame = None
+        self._seq = 0
+        self._closed = False
+        self._event = asyncio.Event()
+        self.dropped = 0
+
+    def put(self, frame: bytes):
+        if self._frame is not None:
+            self.dropped += 1  # never processed - superseded by this one
+        self._frame = frame
+        self._seq += 1
+        self._event.set()
+
+    def close(self):
+        self._closed = True
+        self._event.set()
+
+    async def get(self):
+        """``(seq, frame)`` of the newest frame, or None once closed"""
+        while self._frame is None:
+            if self._closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        frame, self._frame = self._frame, None
+        return self._seq, frame
+
+
+def frame_signature(image_bytes: bytes, size: int = SIGNATURE_SIZE, max_pixels: int = None) -> np.ndarray:
+    """
+    Tiny grayscale thumbnail of a frame, decoded at reduced JPEG scale.
+    Raises preprocess.ImageTooLarge over ``max_pixels`` before decoding.
+    """
+    img = open_image(image_bytes, max_pixels)
+    if img.format == "JPEG":
+        img.draft("L", (size * 2, size * 2))
+    small = img.convert("L").resize((size, size), Image.Resampling.BILINEAR)
+    return np.asarray(small, dtype=np.int16)
+
+
+def frame_difference(a: np.ndarray, b: np.ndarray) -> float:
+    """Mean absolute pixel difference (0-255) between two signatures"""
+    return float(np.abs(a - b).mean())
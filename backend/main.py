@@ -1,21 +1,86 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Header, Query, UploadFile, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from PIL import Image
-import io
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+import asyncio
+import hmac
+import json
 import logging
 import os
 import sys
-
-# Setup logging
-logging.basicConfig(
-    filename="backend.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
+import tempfile
+import threading
+import time
+import traceback
+import zipfile
+
+import numpy as np
+
+from backends import load_model
+from cascade import LatencySLO, needs_escalation
+from detection_cache import (
+    DetectionCache,
+    absolute_boxes,
+    bytes_key,
+    is_perceptual,
+    model_fingerprint,
+    perceptual_key,
+    relative_boxes,
+)
+from inference import InferenceExecutor, InferenceQueueFull, MicroBatcher
+from knowledge import KnowledgeBase
+from live_scan import LatestFrame, frame_difference, frame_signature
+from model_registry import (
+    CANDIDATE_MODES,
+    ControlFile,
+    ModelControl,
+    ModelRegistry,
+    ModelVersion,
+    parameter_bytes,
+    process_rss,
+    same_weights,
+)
+from postprocess import ClassTable, boxes_to_numpy, select_top_k
+from preprocess import ImageTooLarge, open_image, prepare_image
+from response_format import FormatError, ResponseFormat, dumps, loads, negotiate
+from telemetry import PROMETHEUS_CONTENT_TYPE, MetricsRegistry, RequestMetricsMiddleware, setup_logging
+from tiling import MERGERS, merge_boxes, needs_tiling, tile_grid
+from uploads import (
+    BatchTooLarge,
+    UploadTooLarge,
+    decode_data_url,
+    expand_uploads,
+    is_zip_upload,
+    iter_chunks,
+    read_limited,
 )
+from video import ObjectTally, batched, iter_frames, video_info
+
+# Setup logging - queued, so request threads never wait on log I/O
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = os.getenv("LOG_FILE", "backend.log")  # empty = stderr
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+setup_logging(LOG_LEVEL, LOG_FILE, LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Waste Segregate API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load in the background: the port opens immediately, /health answers,
+    # and /ready flips to 200 once the model is loaded and warmed up.
+    # Pre-forked workers (serve.py) inherit an already loaded model.
+    if model_status["state"] == "loading":
+        app.state.model_loading = asyncio.create_task(asyncio.to_thread(initialize_model))
+    watcher = asyncio.create_task(watch_model_control())
+    yield
+    watcher.cancel()
+    inference_executor.shutdown()
+
+
+app = FastAPI(title="Waste Segregate API", version="1.0.0", lifespan=lifespan)
 
 # ─────────────────────────────────────────────────────────────
 # Demo Mode Flag
@@ -24,6 +89,126 @@ app = FastAPI(title="Waste Segregate API", version="1.0.0")
 DEMO_MODE = False  # Changed to False to debug real detection
 
 
+# ─────────────────────────────────────────────────────────────
+# Inference Executor (keeps YOLO off the event loop)
+# ─────────────────────────────────────────────────────────────
+
+# Capped at one thread: all workers would call the same ultralytics YOLO
+# object, whose predictor keeps per-call state (args, imgsz) - concurrent
+# calls either serialize on it or mix up each other's arguments. Parallel
+# inference comes from serve.py worker processes, each with its own model.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 1))
+if INFERENCE_WORKERS > 1:
+    print(f"⚠️ INFERENCE_WORKERS={INFERENCE_WORKERS} ignored: a model can't serve concurrent calls, use SERVE_WORKERS")
+    INFERENCE_WORKERS = 1
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", 8))
+INFERENCE_RETRY_AFTER = int(os.getenv("INFERENCE_RETRY_AFTER", 2))
+
+inference_executor = InferenceExecutor(
+    workers=INFERENCE_WORKERS,
+    max_queue=INFERENCE_QUEUE_SIZE,
+    retry_after=INFERENCE_RETRY_AFTER,
+)
+
+# Concurrent /detect uploads are grouped into one forward pass of up to
+# DETECT_BATCH_SIZE images, waiting at most DETECT_BATCH_WAIT_MS for company.
+DETECT_BATCH_SIZE = int(os.getenv("DETECT_BATCH_SIZE", 4))
+DETECT_BATCH_WAIT_MS = float(os.getenv("DETECT_BATCH_WAIT_MS", 10))
+DETECT_MAX_PENDING = int(os.getenv("DETECT_MAX_PENDING", 32))
+
+# Longest image side fed to the model; uploads are decoded/resized to this
+MODEL_INPUT_SIZE = int(os.getenv("MODEL_INPUT_SIZE", 640))
+
+# Upper bound on images (files or ZIP members) accepted by /detect/batch
+DETECT_BATCH_MAX_IMAGES = int(os.getenv("DETECT_BATCH_MAX_IMAGES", 1000))
+# ...and on its total size, uploaded and once ZIP members are decompressed
+DETECT_BATCH_MAX_BYTES = int(os.getenv("DETECT_BATCH_MAX_BYTES", 256 * 1024 * 1024))
+
+# Single-image upload guards: encoded size, and pixels declared in the
+# header (checked before decoding - decompression bombs never get decoded)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 20 * 1024 * 1024))
+UPLOAD_MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", 50_000_000))
+RAW_IMAGE_TYPES = {"image/jpeg", "image/webp", "image/png"}
+
+
+# ─────────────────────────────────────────────────────────────
+# Detection Result Cache (repeat uploads skip YOLO entirely)
+# ─────────────────────────────────────────────────────────────
+
+DETECT_CACHE_SIZE = int(os.getenv("DETECT_CACHE_SIZE", 256))  # 0 disables
+DETECT_CACHE_TTL = float(os.getenv("DETECT_CACHE_TTL", 600))
+DETECT_CACHE_MODE = os.getenv("DETECT_CACHE_MODE", "exact")  # "exact" or "phash"
+
+detection_cache = DetectionCache(
+    max_entries=DETECT_CACHE_SIZE,
+    ttl_seconds=DETECT_CACHE_TTL,
+    mode=DETECT_CACHE_MODE,
+)
+
+
+# ─────────────────────────────────────────────────────────────
+# Metrics (Prometheus text format at /metrics)
+# ─────────────────────────────────────────────────────────────
+
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    "waste_stage_seconds",
+    "Time spent per detection stage (decode, inference, postprocess, serialize)",
+    ("stage",),
+)
+REQUEST_SECONDS = metrics.histogram(
+    "waste_http_request_seconds", "End-to-end request latency", ("endpoint",)
+)
+REQUESTS = metrics.counter(
+    "waste_http_requests_total", "HTTP requests by endpoint and status", ("endpoint", "method", "status")
+)
+ERRORS = metrics.counter(
+    "waste_http_errors_total", "Requests that failed with a 5xx or an exception", ("endpoint",)
+)
+IN_FLIGHT = metrics.gauge("waste_http_in_flight", "Requests currently being handled")
+MODEL_SECONDS = metrics.histogram(
+    "waste_model_forward_seconds", "Full-model forward pass time per model version", ("model",)
+)
+CASCADE_DECISIONS = metrics.counter(
+    "waste_cascade_total", "Images answered by the fast stage, escalated, or degraded", ("path",)
+)
+TILING_DECISIONS = metrics.counter(
+    "waste_tiling_decisions_total", "Images in tiled mode that ran tiled or single-pass", ("decision",)
+)
+
+
+def queue_depths() -> dict:
+    executor = inference_executor.stats()
+    return {
+        ("executor_queued",): executor["queue_depth"],
+        ("executor_running",): executor["running"],
+        ("batcher_pending",): detect_batcher.stats()["pending"],
+    }
+
+
+def model_info() -> dict:
+    labels = (
+        model_status["model"] or "",
+        model_status["backend"] or "",
+        detection_cache.model_id or "",
+        model_status["state"],
+    )
+    return {labels: 1}
+
+
+def degraded_state() -> dict:
+    return {(): int(latency_slo.degraded)}
+
+
+metrics.gauge("waste_inference_queue", "Inference work waiting or running", ("queue",), collect=queue_depths)
+metrics.gauge("waste_degraded", "1 while the queue-wait SLO is breached", collect=degraded_state)
+metrics.gauge(
+    "waste_model_info", "Loaded model, backend and weights fingerprint",
+    ("model", "backend", "fingerprint", "state"), collect=model_info,
+)
+
+
 # ─────────────────────────────────────────────────────────────
 # CORS enabled for frontend
 # ─────────────────────────────────────────────────────────────
@@ -37,61 +222,203 @@ app.add_middleware(
 )
 
 
-# ─────────────────────────────────────────────────────────────
-# Load YOLOv8 Model (with your custom model)
-# ─────────────────────────────────────────────────────────────
+app.add_middleware(
+    RequestMetricsMiddleware,
+    seconds=REQUEST_SECONDS,
+    requests=REQUESTS,
+    errors=ERRORS,
+    in_flight=IN_FLIGHT,
+)
+
 
 # ─────────────────────────────────────────────────────────────
 # Load YOLOv8 Model (Apostrophe-Safe Path Handling)
 # ─────────────────────────────────────────────────────────────
+# Loading happens in the app lifespan (see initialize_model), not at import,
+# so the process starts fast and /ready tells orchestrators when it can serve.
+
+# CPU runtime: "pytorch", "onnx" or "openvino" (exported once, cached in models/exports)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "pytorch")
+INFERENCE_INT8 = os.getenv("INFERENCE_INT8", "0") == "1"
+CALIBRATION_DIR = os.getenv("CALIBRATION_DIR")  # calibration images for INT8
+
+# Dummy inferences run before reporting ready (first single, then batched)
+WARMUP_RUNS = int(os.getenv("WARMUP_RUNS", 2))
+
+# Cascade: a cheap first pass (CASCADE_MODEL, or the main weights at
+# CASCADE_INPUT_SIZE) and the full model only for images it's unsure about
+CASCADE = os.getenv("CASCADE", "0") == "1"
+CASCADE_MODEL = os.getenv("CASCADE_MODEL")  # smaller weights with the same classes
+CASCADE_INPUT_SIZE = int(os.getenv("CASCADE_INPUT_SIZE", 320))
+CASCADE_ESCALATE_BELOW = float(os.getenv("CASCADE_ESCALATE_BELOW", 0.5))
+
+# Load-aware degrading: while the p95 /detect queue wait is over
+# DETECT_SLO_MS, every image gets the cheap pass only (0 disables)
+DETECT_SLO_MS = float(os.getenv("DETECT_SLO_MS", 0))
+DETECT_SLO_WINDOW_S = float(os.getenv("DETECT_SLO_WINDOW_S", 10))
+
+# Active model (and optional shadow/A-B candidate) - see model_registry.py.
+# Request code takes one ModelVersion snapshot and uses only that.
+registry = ModelRegistry()
+
+# What /ready reports: state is "loading", "ready" or "failed"
+model_status = {
+    "state": "loading",
+    "model": None,
+    "backend": None,
+    "load_ms": None,
+    "warmup_ms": [],
+    "cascade": None,
+    "error": None,
+}
 
-model = None
 
-try:
-    from ultralytics import YOLO
-    from pathlib import Path
+def load_weights(path, backend: str = None):
+    """Load weights on ``backend`` (default INFERENCE_BACKEND), falling back to plain PyTorch; returns (model, backend)"""
+    backend = backend or INFERENCE_BACKEND
+    if backend != "pytorch":
+        try:
+            loaded = load_model(path, backend, MODEL_INPUT_SIZE, INFERENCE_INT8, CALIBRATION_DIR)
+            return loaded, backend + ("-int8" if INFERENCE_INT8 else "")
+        except Exception as e:
+            print(f"⚠️ {backend} backend unavailable ({e}), using PyTorch")
+    return load_model(path, "pytorch"), "pytorch"
+
 
+def find_model_weights() -> Path:
+    """Custom best.pt next to main.py, then ./models/best.pt, then yolov8n.pt"""
     # ✅ USE PATHLIB - Handles apostrophes correctly
-    base_dir = Path(__file__).resolve().parent
-    model_path = base_dir / "models" / "best.pt"
+    model_path = Path(__file__).resolve().parent / "models" / "best.pt"
+    if model_path.exists():
+        return model_path
+
+    # 🔁 FALLBACK 1: Try relative path from current working directory
+    alt_path = Path("models") / "best.pt"
+    if alt_path.exists():
+        return alt_path
+
+    # 🔁 FALLBACK 2: Use default YOLO model
+    print(f"❌ Custom model NOT FOUND at:")
+    print(f"   → {model_path.resolve()}")
+    print(f"   → {alt_path.resolve()}")
+    print(f"🔄 Falling back to default YOLOv8n model...")
+    return Path("yolov8n.pt")
+
+
+def warm_up(loaded, **options) -> list:
+    """Run WARMUP_RUNS dummy inferences at the serving input size; returns ms per run"""
+    blank = np.full((MODEL_INPUT_SIZE, MODEL_INPUT_SIZE, 3), 114, dtype=np.uint8)
+    timings = []
+    for run in range(WARMUP_RUNS):
+        batch = [blank] if run == 0 else [blank] * DETECT_BATCH_SIZE
+        started = time.perf_counter()
+        loaded(batch, device="cpu", verbose=False, **options)
+        timings.append(round(1000 * (time.perf_counter() - started), 1))
+    return timings
+
+
+def load_fast_model(path: Path, names: dict, backend: str = None):
+    """
+    Cascade first stage: CASCADE_MODEL, or a second instance of the main
+    weights (so its smaller input size never leaks into full-model calls).
+    Returns None - and detection stays single-stage - if it can't be used.
+    """
+    fast_path = Path(CASCADE_MODEL) if CASCADE_MODEL else path
+    try:
+        fast, backend = load_weights(fast_path, backend)
+        if fast.names != names:
+            print(f"⚠️ Cascade model {fast_path.name} has different classes, cascade disabled")
+            return None
+        warmup_ms = warm_up(fast, imgsz=CASCADE_INPUT_SIZE)
+    except Exception as e:
+        print(f"⚠️ Cascade model {fast_path.name} failed to load ({e}), cascade disabled")
+        return None
+    print(f"⚡ Cascade stage loaded: {fast_path.name} ({backend}) at {CASCADE_INPUT_SIZE} px, warmup {warmup_ms} ms")
+    return fast, fast_path
+
+
+def load_version(path: Path, backend: str = None) -> ModelVersion:
+    """
+    Load and warm up ``path`` (plus its cascade stage) into a ModelVersion.
+    Blocking; raises if the weights can't be loaded. Nothing is published.
+    """
+    rss_before = process_rss()
+    started = time.perf_counter()
+    requested_backend = backend
+    loaded, backend = load_weights(path, backend)
+    load_ms = round(1000 * (time.perf_counter() - started), 1)
+    print(f"✅ YOLO model loaded: {path.name} ({backend}) in {load_ms} ms")
+    print(f"📊 Model class names: {loaded.names}")
+
+    table = ClassTable(loaded.names, RECYCLING_TIPS)
+    for class_name in table.unknown_classes():
+        print(f"⚠️ Unknown class '{class_name}' will be mapped to Landfill")
+
+    warmup_ms = warm_up(loaded)
+    print(f"🔥 Warmup done: {warmup_ms} ms")
+
+    fast = load_fast_model(path, loaded.names, backend) if CASCADE or DETECT_SLO_MS > 0 else None
+
+    # Cached results belong to one set of weights - a new best.pt (or the
+    # yolov8n.pt fallback) must never be served results from another model.
+    fingerprint = model_fingerprint(path)
+    cache_id = f"{fingerprint}@{backend}"
+    if fast and CASCADE:
+        cache_id += f"+{model_fingerprint(fast[1])}@{CASCADE_INPUT_SIZE}"
+    rss_after = process_rss()
+
+    return ModelVersion(
+        name=f"{fingerprint}@{backend}",
+        model=loaded,
+        table=table,
+        path=path,
+        backend=backend,
+        cache_id=cache_id,
+        load_ms=load_ms,
+        warmup_ms=warmup_ms,
+        fast_model=fast[0] if fast else None,
+        fast_name=f"{fast[1].name}@{CASCADE_INPUT_SIZE}" if fast else None,
+        requested_backend=requested_backend,
+        parameters_bytes=parameter_bytes(loaded),
+        rss_delta_bytes=rss_after - rss_before if rss_before and rss_after else None,
+    )
+
+
+def activate(version: ModelVersion):
+    """Swap ``version`` in; in-flight requests finish on the version they already hold"""
+    previous = registry.publish(version)
+    detection_cache.bind_model(version.cache_id)
+    model_status.update(
+        state="ready",
+        model=version.path.name,
+        backend=version.backend,
+        load_ms=version.load_ms,
+        warmup_ms=version.warmup_ms,
+        cascade=version.fast_name,
+        error=None,
+    )
+    if previous is not None:
+        logger.info(f"🔀 Model swapped: {previous.name} -> {version.name}")
+
+
+def initialize_model():
+    """
+    Load, warm up and publish the model.
+
+    Blocking - runs on a worker thread from the lifespan. The model is only
+    published once warmup is done, so requests never hit a cold model.
+    """
+    try:
+        version = load_version(find_model_weights())
+    except Exception as e:
+        print(f"❌ Model loading failed: {e}")
+        traceback.print_exc()
+        model_status.update(state="failed", error=str(e))
+        detection_cache.bind_model(None)
+        return
+    activate(version)
 
-    # 🔍 DEBUG: Show EXACT path being checked
-    print(f"🔍 Checking model path: {model_path}")
-    print(f"📁 File exists: {model_path.exists()}")
-    print(f"📁 Absolute path: {model_path.resolve()}")
 
-    if model_path.exists():
-        model = YOLO(str(model_path))  # Convert to string for YOLO
-        print(f"✅ Custom YOLO model loaded: {model_path.name}")
-        print(f"📊 Model class names: {model.names}")
-        print(f"📊 Number of classes: {len(model.names)}")
-    else:
-        # 🔁 FALLBACK 1: Try relative path from current working directory
-        alt_path = Path("models") / "best.pt"
-        print(f"⚠️ Primary path not found. Trying alternative: {alt_path.resolve()}")
-
-        if alt_path.exists():
-            model = YOLO(str(alt_path))
-            print(f"✅ Custom model loaded from alternative path")
-            print(f"📊 Model class names: {model.names}")
-            print(f"📊 Number of classes: {len(model.names)}")
-        else:
-            # 🔁 FALLBACK 2: Use default YOLO model
-            print(f"❌ Custom model NOT FOUND at:")
-            print(f"   → {model_path.resolve()}")
-            print(f"   → {alt_path.resolve()}")
-            print(f"🔄 Falling back to default YOLOv8n model...")
-            model = YOLO("yolov8n.pt")
-            print("✅ Default YOLOv8n model loaded successfully.")
-            print(f"📊 Model class names: {model.names}")
-            print(f"📊 Number of classes: {len(model.names)}")
-
-except Exception as e:
-    print(f"❌ Model loading failed: {e}")
-    import traceback
-
-    traceback.print_exc()
-    model = None
 # ─────────────────────────────────────────────────────────────
 # Your 3-WASTE CATEGORIES (MODIFIED FOR YOUR MODEL)
 # ─────────────────────────────────────────────────────────────
@@ -110,6 +437,9 @@ RECYCLING_TIPS = {
     "reuse": "This item can be reused. Consider repurposing it before disposal. Many items like containers, bags, and clothing can have a second life.",
 }
 
+CONF_THRESHOLD = 0.30  # Lower threshold for better detection
+TOP_K = 3  # Detections returned per image
+
 
 # ─────────────────────────────────────────────────────────────
 # Pydantic Models (MODIFIED FOR YOUR 3 CATEGORIES)
@@ -135,6 +465,8 @@ class DetectedItem(BaseModel):
 
 class DetectionResponse(BaseModel):
     items: list[DetectedItem]
+    degraded: bool = False  # cheap cascade pass only, served while over the latency SLO
+    approximate: bool = False  # phash cache hit: boxes of a near-identical frame, rescaled
 
 
 class ChatRequest(BaseModel):
@@ -143,7 +475,7 @@ class ChatRequest(BaseModel):
 
 class ChatResponse(BaseModel):
     response: str
-    binSuggestion: str = "reuse"  # Default to your category
+    binSuggestion: str = "Recycle"  # Frontend bin name, same as DetectedItem.bin
 
 
 # ─────────────────────────────────────────────────────────────
@@ -200,7 +532,38 @@ def get_bin_for_item(class_id: int) -> str:
 @app.get("/health")
 def health_check():
     """Health check endpoint - always returns ok"""
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "model": model_status["state"],
+        "inference": inference_executor.stats(),
+        "batching": detect_batcher.stats(),
+        "slo": latency_slo.stats(),
+        "cache": detection_cache.stats(),
+        "chat": knowledge_base.stats(),
+    }
+
+
+@app.get("/ready")
+def readiness_check():
+    """Readiness probe - 200 once the model is loaded and warmed up, 503 before"""
+    status_code = 200 if model_status["state"] == "ready" else 503
+    return JSONResponse(status_code=status_code, content=model_status)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Per-stage latency, request/error counts, queue depth and model info (this process only)"""
+    return Response(content=metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def ensure_model_loaded():
+    """Turn requests away while the model is still loading instead of answering empty"""
+    if model_status["state"] == "loading":
+        raise HTTPException(
+            status_code=503,
+            detail="Model is still loading, please retry shortly.",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+        )
 
 
 # ─────────────────────────────────────────────────────────────
@@ -214,199 +577,1022 @@ def health_check():
 # ─────────────────────────────────────────────────────────────
 
 
-@app.post("/detect", response_model=DetectionResponse)
-async def detect_waste(image: UploadFile = File(...)):
+def decode_image(image_bytes: bytes, filename: str = None):
     """
-    Detect waste items using YOUR CUSTOM YOLO MODEL ONLY
+    Decode uploaded bytes into a model-sized PreparedImage (reduced JPEG
+    decode, resize before RGB conversion, EXIF orientation applied), or
+    None if unreadable.
     """
-    print(f"📥 Received detection request: {image.filename} ({image.content_type})")
-
-    # Read image
     try:
-        image_bytes = await image.read()
-        pil_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        logger.info(f"Image read successful: {image.filename}")
+        with STAGE_SECONDS.time(stage="decode"):
+            prepared = prepare_image(image_bytes, MODEL_INPUT_SIZE, UPLOAD_MAX_PIXELS)
+        logger.debug(f"Image read successful: {filename}")
+        return prepared
     except Exception as e:
-        logger.error(f"Image read failed: {e}")
-        if DEMO_MODE:
-            return FALLBACK_DEMO_RESPONSE
+        logger.warning(f"Image read failed: {e}", extra={"upload": filename})
+        return None
+
+
+def build_detection_response(result, prepared=None, table: ClassTable = None) -> DetectionResponse:
+    """
+    Turn one ultralytics result into the top-3 DetectionResponse.
+
+    Filtering, bin mapping and top-k selection run on the whole box array at
+    once (see postprocess.py); only the surviving boxes become DetectedItems.
+    Boxes are mapped back into original-image coordinates via ``prepared``.
+    ``table`` is the ClassTable of the model that produced ``result``
+    (default: the active model's).
+    """
+    return response_from_boxes(boxes_to_numpy(result.boxes), prepared, table)
+
+
+def response_from_boxes(data: np.ndarray, prepared=None, table: ClassTable = None) -> DetectionResponse:
+    """Top-3 DetectionResponse from an ``(n, 6)`` box array (see build_detection_response)"""
+    class_table = table or registry.active.table
+    rows, ids, confidences = select_top_k(
+        data, class_table, conf_threshold=CONF_THRESHOLD, top_k=TOP_K
+    )
+    if not len(rows):
+        logger.debug("⚠️ No waste items detected above confidence threshold")
         return DetectionResponse(items=[])
 
-    # ─── ONLY STRATEGY: YOUR CUSTOM YOLO MODEL ───
-    if model:
-        try:
-            print("🚀 Starting YOLOv8 inference with YOUR MODEL...")
-            results = model(pil_image, device="cpu", verbose=False)
-
-            detected_items = []
-            for result in results:
-                for box in result.boxes:
-                    try:
-                        conf = float(box.conf[0])
-                        if conf < 0.30:  # Lower threshold for better detection
-                            continue
-
-                        class_id = int(box.cls[0])
-                        class_name = model.names[class_id].lower()
-                        print(
-                            f"🔍 Detected: class_id={class_id}, class_name='{class_name}'"
-                        )
-
-                        # 🛑 EXPLICIT FILTER: Ignore people
-                        if class_name in ["person", "face", "hand", "man", "woman"]:
-                            continue
-
-                        x1, y1, x2, y2 = box.xyxy[0].tolist()
-
-                        # 🔑 CRITICAL: Map YOUR categories to FRONTEND's expected categories
-                        # Frontend expects: "Recycle", "Organic", "Landfill", "Hazardous"
-
-                        # More flexible category mapping to handle various model class names
-                        class_name_lower = class_name.lower().strip()
-
-                        if class_name_lower in [
-                            "recyclable",
-                            "recycle",
-                            "recycling",
-                            "recyclables",
-                        ]:
-                            bin_category = "Recycle"
-                        elif class_name_lower in [
-                            "organic",
-                            "organics",
-                            "compost",
-                            "food-waste",
-                            "bio",
-                        ]:
-                            bin_category = "Organic"
-                        elif class_name_lower in ["reuse", "reusable", "reusables"]:
-                            bin_category = "Recycle"  # Reusable items go to Recycle bin
-                        elif class_name_lower in [
-                            "hazardous",
-                            "toxic",
-                            "dangerous",
-                            "chemical",
-                        ]:
-                            bin_category = "Hazardous"
-                        else:
-                            # Fallback for unknown classes
-                            bin_category = "Landfill"
-                            print(
-                                f"⚠️ Unknown class '{class_name}' (id={class_id}) mapped to Landfill"
-                            )
-
-                        print(
-                            f"✅ Mapped: '{class_name}' → bin_category='{bin_category}'"
-                        )
-
-                        # Get recycling tips based on YOUR category name
-                        waste_tip = RECYCLING_TIPS.get(
-                            class_name, "Dispose properly in appropriate bin."
-                        )
-
-                        detected_items.append(
-                            DetectedItem(
-                                id=len(detected_items) + 1,
-                                itemType=class_name.capitalize(),
-                                bin=bin_category,  # ✅ NOW MATCHES FRONTEND EXPECTATION
-                                contaminated=False,
-                                confidence=min(
-                                    conf * 1.1, 0.95
-                                ),  # Artificially boost confidence slightly,
-                                bbox=BoundingBox(
-                                    x=int(x1), y=int(y1), w=int(x2 - x1), h=int(y2 - y1)
-                                ),
-                                metadata={
-                                    "transformation": f"Processed into raw material for new {class_name} products.",
-                                    "impact": f"Recycling {class_name} reduces landfill waste and conserves resources.",
-                                    "fun_fact": f"{class_name.capitalize()} waste can be transformed into useful products!",
-                                    "recycling_tips": waste_tip,
-                                },
-                            )
-                        )
-                    except Exception as e:
-                        print(f"Error processing box: {e}")
-                        continue
-
-            if detected_items:
-                detected_items.sort(key=lambda x: x.confidence, reverse=True)
-                print(
-                    f"✅ Sending to frontend: {[{'item': d.itemType, 'bin': d.bin, 'conf': d.confidence} for d in detected_items[:3]]}"
-                )
-                return DetectionResponse(items=detected_items[:3])
+    xyxy = rows[:, :4]
+    if prepared is not None:
+        xyxy = xyxy * (prepared.scale_x, prepared.scale_y, prepared.scale_x, prepared.scale_y)
+
+    # Every value below already has the right type, so the models are
+    # constructed without re-running Pydantic validation on each box
+    detected_items = []
+    for (x1, y1, x2, y2), class_id, item_id, conf in zip(
+        xyxy.tolist(), rows[:, 5].astype(int).tolist(), ids.tolist(), confidences.tolist()
+    ):
+        detected_items.append(
+            DetectedItem.model_construct(
+                id=item_id,
+                itemType=class_table.item_types[class_id],
+                bin=class_table.bins[class_id],  # ✅ NOW MATCHES FRONTEND EXPECTATION
+                contaminated=False,
+                confidence=conf,  # Artificially boosted slightly, see select_top_k
+                bbox=BoundingBox.model_construct(
+                    x=int(x1), y=int(y1), w=int(x2 - x1), h=int(y2 - y1)
+                ),
+                metadata=class_table.metadata[class_id],
+            )
+        )
 
-            print("⚠️ No waste items detected above confidence threshold")
-            return DetectionResponse(items=[])
+    logger.debug(
+        f"✅ Sending to frontend: {[{'item': d.itemType, 'bin': d.bin, 'conf': d.confidence} for d in detected_items]}"
+    )
+    return DetectionResponse.model_construct(items=detected_items)
 
-        except Exception as e:
-            print(f"❌ YOLO Error: {e}")
-            logger.error(f"YOLO Error: {e}")
-            return DetectionResponse(items=[])
 
+def empty_response() -> DetectionResponse:
+    """Response used when an image can't be analysed"""
     if DEMO_MODE:
-        print("🎁 Returning FALLBACK_DEMO_RESPONSE")
+        logger.info("🎁 Returning FALLBACK_DEMO_RESPONSE")
         return FALLBACK_DEMO_RESPONSE
     return DetectionResponse(items=[])
 
 
+def detect_images(images: list, cache_keys: list = None, raise_errors: bool = False) -> list:
+    """
+    Run YOUR CUSTOM YOLO MODEL on already-decoded images in a single forward
+    pass. ``None`` entries (unreadable uploads) get the empty response.
+
+    With CASCADE the cheap first stage runs on every image and only the
+    ones it's unsure about go through the full model (in one more pass).
+    While the queue-wait SLO is breached, the first stage's answer is used
+    for every image and the responses are marked ``degraded``.
+
+    Results the model actually produced are stored in the detection cache
+    under every key in ``cache_keys[i]`` (degraded ones are not cached).
+
+    A model error answers every image of the batch with no items, unless
+    ``raise_errors`` is set - then it propagates, so offline callers can
+    tell a failed pass from an empty scene.
+
+    Blocking - called on the inference executor, never on the event loop.
+    Returns one DetectionResponse per image, in order.
+    """
+    responses = [empty_response() for _ in images]
+
+    # ─── ONLY STRATEGY: YOUR CUSTOM YOLO MODEL ───
+    # One version for the whole batch: a swap mid-batch can't mix models
+    version, shadow = registry.route()
+    valid = [i for i, prepared in enumerate(images) if prepared is not None]
+    if version is None or not valid:
+        return responses
+
+    def finish(i, response):
+        responses[i] = response
+        if cache_keys and cache_keys[i] and not response.degraded:
+            payload = response.model_dump_json()
+            for key in cache_keys[i]:
+                if is_perceptual(key):
+                    # Near-duplicates can have another resolution: store size-relative boxes
+                    relative = relative_boxes(response.model_dump(), images[i].original_size)
+                    detection_cache.put(key, dumps(relative), model_id=version.cache_id)
+                else:
+                    detection_cache.put(key, payload, model_id=version.cache_id)
+
+    fast_model = version.fast_model
+    degraded = fast_model is not None and latency_slo.degraded
+    cascade = fast_model is not None and (CASCADE or degraded)
+    try:
+        full = valid
+        if cascade:
+            with STAGE_SECONDS.time(stage="inference"):
+                results = fast_model(
+                    [images[i].image for i in valid],
+                    device="cpu", imgsz=CASCADE_INPUT_SIZE, verbose=False,
+                )
+            full = []
+            for i, result in zip(valid, results):
+                data = boxes_to_numpy(result.boxes)
+                if not degraded and needs_escalation(
+                    data, version.table, CONF_THRESHOLD, CASCADE_ESCALATE_BELOW
+                ):
+                    full.append(i)
+                    continue
+                CASCADE_DECISIONS.inc(path="degraded" if degraded else "fast")
+                with STAGE_SECONDS.time(stage="postprocess"):
+                    response = response_from_boxes(data, images[i], version.table)
+                response.degraded = degraded
+                finish(i, response)
+
+        if full:
+            logger.debug(f"🚀 Starting YOLOv8 inference with YOUR MODEL (batch of {len(full)})...")
+            batch = [images[i].image for i in full]
+            results = timed_forward(version, batch)
+            for i, result in zip(full, results):
+                if cascade:
+                    CASCADE_DECISIONS.inc(path="escalated")
+                with STAGE_SECONDS.time(stage="postprocess"):
+                    finish(i, build_detection_response(result, images[i], version.table))
+            if shadow is not None:
+                submit_shadow(shadow, batch)
+    except Exception as e:
+        logger.exception(f"❌ YOLO Error: {e}")
+        if raise_errors:
+            raise
+        for i in valid:
+            responses[i] = DetectionResponse(items=[])
+
+    return responses
+
+
+def timed_forward(version: ModelVersion, batch: list):
+    """Full-model forward pass, recorded in the version's latency window"""
+    started = time.perf_counter()
+    with STAGE_SECONDS.time(stage="inference"):
+        results = version.model(batch, device="cpu", verbose=False)
+    elapsed = time.perf_counter() - started
+    version.latency.observe(elapsed, len(batch))
+    MODEL_SECONDS.observe(elapsed, model=version.name)
+    return results
+
+
+# Shadow passes run on their own thread, one at a time; when the previous
+# one is still running the sample is skipped rather than queued
+shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+shadow_slot = threading.Semaphore(1)
+
+
+def submit_shadow(version: ModelVersion, batch: list):
+    """Time the candidate on a batch the active model already answered"""
+    if not shadow_slot.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            started = time.perf_counter()
+            version.model(batch, device="cpu", verbose=False)  # results discarded
+            elapsed = time.perf_counter() - started
+            version.latency.observe(elapsed, len(batch))
+            MODEL_SECONDS.observe(elapsed, model=version.name)
+        except Exception as e:
+            logger.warning(f"Shadow inference on {version.name} failed: {e}")
+        finally:
+            shadow_slot.release()
+
+    shadow_pool.submit(run)
+
+
+def run_detection_batch(uploads: list) -> list:
+    """
+    Decode a batch of (image_bytes, filename, cache_key) uploads and detect
+    on them. In phash mode, near-duplicates of cached frames skip the model.
+    """
+    images = [decode_image(image_bytes, filename) for image_bytes, filename, _ in uploads]
+    cache_keys = [[key] if key else [] for _, _, key in uploads]
+    responses = [None] * len(images)
+
+    if detection_cache.perceptual:
+        for i, prepared in enumerate(images):
+            if prepared is None:
+                continue
+            key = perceptual_key(prepared.image)
+            if key is None:
+                continue
+            cached = detection_cache.get(key)
+            if cached is not None:
+                hit = absolute_boxes(loads(cached), prepared.original_size)
+                responses[i] = DetectionResponse.model_validate({**hit, "approximate": True})
+            else:
+                cache_keys[i].append(key)
+
+    misses = [i for i, response in enumerate(responses) if response is None]
+    if misses:
+        detected = detect_images(
+            [images[i] for i in misses], [cache_keys[i] for i in misses]
+        )
+        for i, response in zip(misses, detected):
+            responses[i] = response
+    return responses
+
+
+latency_slo = LatencySLO(DETECT_SLO_MS, window_s=DETECT_SLO_WINDOW_S)
+
+
+def observe_queue_wait(wait_seconds: float):
+    """/detect queue waits drive the degraded mode (see cascade.py)"""
+    if latency_slo.observe(wait_seconds):
+        if latency_slo.degraded:
+            logger.warning(f"🐢 p95 queue wait over {DETECT_SLO_MS:g} ms - serving the fast stage only")
+        else:
+            logger.info("✅ Queue wait back under the SLO - full detection restored")
+
+
+detect_batcher = MicroBatcher(
+    inference_executor,
+    run_detection_batch,
+    max_batch_size=DETECT_BATCH_SIZE,
+    max_wait_ms=DETECT_BATCH_WAIT_MS,
+    max_pending=DETECT_MAX_PENDING,
+    on_wait=observe_queue_wait,
+)
+
+
 # ─────────────────────────────────────────────────────────────
-# Chat Endpoint (MODIFIED FOR YOUR 3 CATEGORIES)
+# Tiled Detection (small items in large, crowded photos)
 # ─────────────────────────────────────────────────────────────
 
+# "off": always single pass; "on": always tile; "auto": tile only when
+# needs_tiling() says the single pass is likely missing small items
+DETECT_TILING = os.getenv("DETECT_TILING", "off")
+TILING_MODES = ("off", "auto", "on")
+TILE_MAX_SIDE = int(os.getenv("TILE_MAX_SIDE", 1920))  # photo is decoded to this for tiling
+TILE_OVERLAP = float(os.getenv("TILE_OVERLAP", 0.2))
+TILE_MERGE = os.getenv("TILE_MERGE", "wbf")  # "wbf" or "nms"
+if TILE_MERGE not in MERGERS:
+    raise ValueError(f"Unknown TILE_MERGE '{TILE_MERGE}', expected one of {tuple(MERGERS)}")
+TILE_IOU = float(os.getenv("TILE_IOU", 0.5))
+TILE_MIN_SIDE = int(os.getenv("TILE_MIN_SIDE", 1600))
+TILE_DENSITY = int(os.getenv("TILE_DENSITY", 4))
+TILE_SMALL_BOX = float(os.getenv("TILE_SMALL_BOX", 0.01))  # fraction of the photo area
+
+
+def detect_tiled(image_bytes: bytes, filename: str, mode: str, cache_key: str = None):
+    """
+    Single pass at MODEL_INPUT_SIZE, then - if ``mode`` is "on", or "auto"
+    and the first pass calls for it - overlapping MODEL_INPUT_SIZE tiles of
+    a TILE_MAX_SIDE decode in one batched forward pass, merged with the
+    full-frame boxes. Blocking - runs on the inference executor.
+    """
+    version = registry.active
+    prepared = decode_image(image_bytes, filename)
+    if prepared is None or version is None:
+        return empty_response()
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat_assistant(request: ChatRequest):
+    try:
+        result = timed_forward(version, [prepared.image])[0]
+        full = boxes_to_numpy(result.boxes).copy()
+        full[:, :4] *= (prepared.scale_x, prepared.scale_y, prepared.scale_x, prepared.scale_y)
+
+        if mode == "auto" and not needs_tiling(
+            prepared.original_size, full, CONF_THRESHOLD, MODEL_INPUT_SIZE,
+            TILE_MIN_SIDE, TILE_DENSITY, TILE_SMALL_BOX,
+        ):
+            TILING_DECISIONS.inc(decision="single")
+            parts = [full]
+        else:
+            TILING_DECISIONS.inc(decision="tiled")
+            with STAGE_SECONDS.time(stage="decode"):
+                large = prepare_image(image_bytes, TILE_MAX_SIDE)
+            tiles = tile_grid(large.image.width, large.image.height, MODEL_INPUT_SIZE, TILE_OVERLAP)
+            logger.debug(f"🧩 Tiling {filename}: {len(tiles)} tiles")
+            results = timed_forward(version, [large.image.crop(t) for t in tiles])
+            parts = [full]
+            for (x0, y0, _, _), tile_result in zip(tiles, results):
+                boxes = boxes_to_numpy(tile_result.boxes).copy()
+                boxes[:, :4] += (x0, y0, x0, y0)
+                boxes[:, :4] *= (large.scale_x, large.scale_y, large.scale_x, large.scale_y)
+                parts.append(boxes)
+
+        with STAGE_SECONDS.time(stage="postprocess"):
+            response = response_from_boxes(merge_boxes(parts, TILE_MERGE, TILE_IOU), table=version.table)
+    except Exception as e:
+        logger.exception(f"❌ YOLO Error: {e}")
+        return DetectionResponse(items=[])
+
+    if cache_key:
+        detection_cache.put(cache_key, response.model_dump_json(), model_id=version.cache_id)
+    return response
+
+
+def requested_format(format: str, fields: str, accept: str = None) -> ResponseFormat:
+    try:
+        return negotiate(format, fields, accept)
+    except FormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def encode_response(fmt: ResponseFormat, response: DetectionResponse = None, cached: bytes = None):
+    """HTTP response for a DetectionResponse or a cached full-JSON payload, in ``fmt``"""
+    with STAGE_SECONDS.time(stage="serialize"):
+        if fmt.is_default:
+            content = cached if cached is not None else response.model_dump_json()
+        else:
+            content = fmt.encode(loads(cached) if cached is not None else response.model_dump())
+    return Response(content=content, media_type=fmt.media_type, headers={"Vary": "Accept"})
+
+
+def detection_options(tiling: str, output_format: str, fields: str, accept: str = None):
+    """Validated (tiling mode, ResponseFormat) from the shared /detect query parameters"""
+    tiling = tiling or DETECT_TILING
+    if tiling not in TILING_MODES:
+        raise HTTPException(status_code=400, detail=f"tiling must be one of {', '.join(TILING_MODES)}.")
+    fmt = requested_format(output_format, fields, accept)
+    if tiling != "off" and latency_slo.degraded:
+        tiling = "off"  # over the latency SLO: no extra tile passes
+    return tiling, fmt
+
+
+def check_pixels(image_bytes: bytes):
+    """413 for images declaring more than UPLOAD_MAX_PIXELS (header only, nothing decoded)"""
+    try:
+        open_image(image_bytes, UPLOAD_MAX_PIXELS)
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception:
+        pass  # unreadable: answered like any other undecodable upload
+
+
+async def detect_upload(image_bytes: bytes, filename: str, tiling: str, fmt: ResponseFormat):
+    """Cache lookup, then the micro-batcher (or a tiled pass), for one uploaded image"""
+    cache_key = bytes_key(image_bytes) if detection_cache.enabled else None
+    if cache_key and tiling != "off":
+        cache_key = f"{cache_key}:tiling={tiling}"
+    cached = detection_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        logger.debug("♻️ Cache hit - skipping YOLO")
+        return encode_response(fmt, cached=cached)
+
+    try:
+        if tiling == "off":
+            response = await detect_batcher.submit((image_bytes, filename, cache_key))
+        else:
+            response = await inference_executor.run(
+                detect_tiled, image_bytes, filename, tiling, cache_key
+            )
+    except InferenceQueueFull as e:
+        logger.warning(f"Inference queue full, rejecting {filename}")
+        raise HTTPException(
+            status_code=503,
+            detail="Detection service is busy, please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    return encode_response(fmt, response)
+
+
+@app.post("/detect", response_model=DetectionResponse)
+async def detect_waste(
+    image: UploadFile = File(...),
+    tiling: str = None,
+    output_format: str = Query(None, alias="format"),
+    fields: str = None,
+    accept: str = Header(None),
+):
+    """
+    Detect waste items using YOUR CUSTOM YOLO MODEL ONLY
+
+    ``tiling`` ("off", "auto" or "on", default DETECT_TILING) enables tiled
+    inference for large photos with small or many items. ``format``
+    ("full", "compact" or "msgpack"), ``fields`` and the Accept header
+    select the response encoding (see response_format.py).
+    """
+    logger.debug(f"📥 Received detection request: {image.filename} ({image.content_type})")
+
+    tiling, fmt = detection_options(tiling, output_format, fields, accept)
+    ensure_model_loaded()
+    if image.size is not None and image.size > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=str(UploadTooLarge(UPLOAD_MAX_BYTES)))
+    image_bytes = await image.read()
+    check_pixels(image_bytes)
+
+    return await detect_upload(image_bytes, image.filename, tiling, fmt)
+
+
+@app.post("/detect/raw", response_model=DetectionResponse)
+async def detect_waste_raw(
+    request: Request,
+    tiling: str = None,
+    output_format: str = Query(None, alias="format"),
+    fields: str = None,
+    accept: str = Header(None),
+):
     """
-    AI Assistant to answer waste related questions using your model's knowledge.
+    /detect with the image as the request body (``Content-Type: image/jpeg``,
+    ``image/webp`` or ``image/png``): no multipart parsing, and the body is
+    refused as soon as it grows past UPLOAD_MAX_BYTES.
     """
-    # Since we're using YOUR MODEL ONLY, we don't have Gemini
+    content_type = (request.headers.get("content-type") or "").split(";")[0].strip().lower()
+    if content_type not in RAW_IMAGE_TYPES:
+        raise HTTPException(
+            status_code=415, detail=f"Content-Type must be one of {', '.join(sorted(RAW_IMAGE_TYPES))}."
+        )
+    tiling, fmt = detection_options(tiling, output_format, fields, accept)
+    ensure_model_loaded()
+
     try:
-        # Basic response based on your categories
-        query = request.query.lower()
+        if int(request.headers.get("content-length") or 0) > UPLOAD_MAX_BYTES:
+            raise UploadTooLarge(UPLOAD_MAX_BYTES)
+        image_bytes = await read_limited(request.stream(), UPLOAD_MAX_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    check_pixels(image_bytes)
+    logger.debug(f"📥 Received raw detection request: {len(image_bytes)} bytes ({content_type})")
+
+    return await detect_upload(image_bytes, "raw-upload", tiling, fmt)
+
+
+class Base64DetectRequest(BaseModel):
+    image: str  # data:image/...;base64,... URL or bare base64
+    filename: str = "base64-upload"
+
+
+@app.post("/detect/base64", response_model=DetectionResponse)
+async def detect_waste_base64(
+    request: Request,
+    tiling: str = None,
+    output_format: str = Query(None, alias="format"),
+    fields: str = None,
+    accept: str = Header(None),
+):
+    """
+    /detect for JSON clients: ``{"image": "data:image/jpeg;base64,..."}``.
+    The body is read with a size limit and the base64 length is checked
+    before anything is decoded.
+    """
+    tiling, fmt = detection_options(tiling, output_format, fields, accept)
+    ensure_model_loaded()
 
-        # Simple logic to determine which bin category to suggest
-        bin_suggestion = "reuse"  # Default
+    # base64 is 4/3 the size of the image, plus room for the JSON around it
+    max_body = UPLOAD_MAX_BYTES * 4 // 3 + 4096
+    try:
+        body = await read_limited(request.stream(), max_body)
+        payload = Base64DetectRequest.model_validate_json(body)
+        image_bytes = decode_data_url(payload.image, UPLOAD_MAX_BYTES)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=str(UploadTooLarge(UPLOAD_MAX_BYTES)))
+    except ValueError as e:  # includes pydantic.ValidationError
+        raise HTTPException(status_code=400, detail=f"Invalid request: {e}")
+    check_pixels(image_bytes)
 
-        if (
-            "recycle" in query
-            or "plastic" in query
-            or "bottle" in query
-            or "can" in query
-        ):
-            bin_suggestion = "recyclable"
-        elif (
-            "organic" in query
-            or "food" in query
-            or "compost" in query
-            or "garden" in query
-        ):
-            bin_suggestion = "organic"
-        elif (
-            "reuse" in query
-            or "repurpose" in query
-            or "donate" in query
-            or "second life" in query
-        ):
-            bin_suggestion = "reuse"
+    return await detect_upload(image_bytes, payload.filename, tiling, fmt)
+
+
+# ─────────────────────────────────────────────────────────────
+# Batch Detection Endpoint (streams NDJSON, one line per image)
+# ─────────────────────────────────────────────────────────────
 
-        # Create a helpful response
-        response = f"Based on your query about '{request.query}', I suggest you place this item in the {bin_suggestion} bin. "
 
-        if bin_suggestion == "recyclable":
-            response += (
-                "This can be processed into new materials, saving resources and energy."
+def decode_sources(sources: list) -> list:
+    """Load and decode (name, load) sources - blocking, runs on a worker thread"""
+    images = []
+    for name, load in sources:
+        try:
+            image_bytes = load()
+        except Exception as e:
+            logger.error(f"Reading {name} failed: {e}")
+            image_bytes = b""
+        images.append(decode_image(image_bytes, name))
+    return images
+
+
+async def run_when_ready(fn, *args):
+    """Run ``fn`` on the inference executor, waiting out a full queue instead of failing"""
+    while True:
+        try:
+            return await inference_executor.run(fn, *args)
+        except InferenceQueueFull as e:
+            await asyncio.sleep(e.retry_after)
+
+
+@app.post("/detect/batch")
+async def detect_waste_batch(
+    images: list[UploadFile] = File(...),
+    output_format: str = Query(None, alias="format"),
+    fields: str = None,
+):
+    """
+    Detect waste in many images at once - multipart files and/or ZIP archives.
+
+    Streams NDJSON: one line per image, in upload order, as soon as its chunk
+    has been through the model. Decoding of the next chunk overlaps with
+    inference on the current one. ``format=compact`` and ``fields`` shape
+    each line like the /detect response.
+    """
+    fmt = requested_format(output_format, fields)
+    if fmt.binary:
+        raise HTTPException(status_code=400, detail="/detect/batch streams NDJSON - use format=compact.")
+    ensure_model_loaded()
+    # Single images are capped like /detect; archives share the batch budget
+    uploads, budget = [], DETECT_BATCH_MAX_BYTES
+    try:
+        for f in images:
+            limit = budget if is_zip_upload(f.filename, f.content_type) else min(budget, UPLOAD_MAX_BYTES)
+            data = await read_limited(iter_chunks(f), limit)
+            budget -= len(data)
+            uploads.append((f.filename, f.content_type, data))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"{f.filename}: {e}")
+    try:
+        sources = expand_uploads(
+            uploads,
+            max_member_bytes=UPLOAD_MAX_BYTES,
+            max_images=DETECT_BATCH_MAX_IMAGES,
+            max_total_bytes=DETECT_BATCH_MAX_BYTES,
+        )
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Uploaded ZIP archive is corrupt.")
+    except BatchTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    logger.info(f"📥 Received batch detection request: {len(sources)} images")
+    chunks = [
+        sources[i : i + DETECT_BATCH_SIZE]
+        for i in range(0, len(sources), DETECT_BATCH_SIZE)
+    ]
+
+    async def stream():
+        index = 0
+        decoding = None
+        try:
+            if chunks:
+                decoding = asyncio.ensure_future(asyncio.to_thread(decode_sources, chunks[0]))
+            for n, chunk in enumerate(chunks):
+                decoded = await decoding
+                if n + 1 < len(chunks):
+                    decoding = asyncio.ensure_future(
+                        asyncio.to_thread(decode_sources, chunks[n + 1])
+                    )
+                responses = await run_when_ready(detect_images, decoded)
+
+                for (name, _), prepared, response in zip(chunk, decoded, responses):
+                    line = {"index": index, "filename": name, **response.model_dump()}
+                    if prepared is None:
+                        line["error"] = "Unreadable image"
+                    yield fmt.encode(line) + b"\n"
+                    index += 1
+        finally:
+            # Client went away mid-stream: don't leave a decode running
+            if decoding is not None and not decoding.done():
+                decoding.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# ─────────────────────────────────────────────────────────────
+# Video Endpoint (strided frames, batched YOLO, one count per tracked object)
+# ─────────────────────────────────────────────────────────────
+
+VIDEO_FRAME_STRIDE = int(os.getenv("VIDEO_FRAME_STRIDE", 5))  # run YOLO on every Nth frame
+VIDEO_BATCH_SIZE = int(os.getenv("VIDEO_BATCH_SIZE", 8))
+VIDEO_MAX_BYTES = int(os.getenv("VIDEO_MAX_BYTES", 500 * 1024 * 1024))
+VIDEO_MIN_TRACK_FRAMES = int(os.getenv("VIDEO_MIN_TRACK_FRAMES", 2))
+VIDEO_TRACK_CONF = 0.1  # ByteTrack uses low-confidence boxes to keep tracks alive
+
+
+def spool_video(upload: UploadFile, suffix: str) -> str:
+    """Copy an upload to a temp file in chunks (OpenCV needs a path); blocking"""
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as out:
+        upload.file.seek(0)
+        written = 0
+        while chunk := upload.file.read(1024 * 1024):
+            written += len(chunk)
+            if written > VIDEO_MAX_BYTES:
+                out.close()
+                os.unlink(out.name)
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Video is larger than {VIDEO_MAX_BYTES // (1024 * 1024)} MB.",
+                )
+            out.write(chunk)
+    return out.name
+
+
+def track_batch(version: ModelVersion, tally: ObjectTally, batch: list):
+    """One forward pass over a batch of frames, then tracker updates in frame order"""
+    with STAGE_SECONDS.time(stage="inference"):
+        results = version.model(
+            [frame for _, frame in batch], device="cpu", conf=VIDEO_TRACK_CONF, verbose=False
+        )
+    for (index, _), result in zip(batch, results):
+        tally.update(index, result)
+
+
+@app.post("/detect/video")
+async def detect_waste_video(video: UploadFile = File(...), stride: int = VIDEO_FRAME_STRIDE):
+    """
+    Count waste objects in a video clip.
+
+    Every ``stride``-th frame goes through the model, ``VIDEO_BATCH_SIZE``
+    frames per forward pass, and ByteTrack links detections across frames
+    so each object is counted once. Streams NDJSON: a ``progress`` line per
+    batch with the running counts, then a ``summary`` line listing every
+    counted object.
+    """
+    ensure_model_loaded()
+    if stride < 1:
+        raise HTTPException(status_code=400, detail="stride must be at least 1.")
+    # The whole clip runs on one model version, even if another is swapped in meanwhile
+    version = registry.active
+    if version is None:
+        raise HTTPException(status_code=503, detail="No model is loaded.")
+
+    suffix = Path(video.filename or "").suffix or ".mp4"
+    path = await asyncio.to_thread(spool_video, video, suffix)
+    info = await asyncio.to_thread(video_info, path)
+    if info is None:
+        os.unlink(path)
+        raise HTTPException(status_code=400, detail="Unreadable video.")
+
+    logger.info(f"🎬 Received video: {video.filename} ({info['frames']} frames, stride {stride})")
+    tally = ObjectTally(version.table, info["fps"] / stride, VIDEO_MIN_TRACK_FRAMES)
+    frames = iter_frames(path, stride, MODEL_INPUT_SIZE)
+    batches = batched(frames, VIDEO_BATCH_SIZE)
+
+    def cleanup(_=None):
+        batches.close()
+        frames.close()
+        os.unlink(path)
+
+    async def stream():
+        sampled = last_frame = 0
+        # Decode the next batch while the model works on the current one
+        decoding = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+        try:
+            while (batch := await decoding) is not None:
+                decoding = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+                await run_when_ready(track_batch, version, tally, batch)
+                sampled += len(batch)
+                last_frame = batch[-1][0]
+                progress = min(1.0, (last_frame + 1) / info["frames"]) if info["frames"] else None
+                yield json.dumps(
+                    {"type": "progress", "frame": last_frame, "sampled": sampled,
+                     "progress": progress, **tally.counts()}
+                ) + "\n"
+
+            yield json.dumps(
+                {"type": "summary", "frames": last_frame + 1, "sampled": sampled, "stride": stride,
+                 **tally.counts(), "items": tally.objects()}
+            ) + "\n"
+        finally:
+            # A decode thread may still be running (client went away): clean up after it
+            if decoding.done():
+                cleanup()
+            else:
+                decoding.add_done_callback(cleanup)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# ─────────────────────────────────────────────────────────────
+# Live Scan WebSocket (latest frame wins, unchanged scenes skip YOLO)
+# ─────────────────────────────────────────────────────────────
+
+# Mean pixel change (0-255, on a 32x32 grayscale thumbnail) that counts as a new scene
+LIVE_DIFF_THRESHOLD = float(os.getenv("LIVE_DIFF_THRESHOLD", 6.0))
+LIVE_MAX_FRAME_BYTES = int(os.getenv("LIVE_MAX_FRAME_BYTES", 2 * 1024 * 1024))
+
+
+@app.websocket("/ws/scan")
+async def live_scan(websocket: WebSocket):
+    """
+    Continuous scanning over one WebSocket.
+
+    The client sends each camera frame as a binary message (JPEG/PNG/WebP
+    bytes). Frames that arrive while one is being analysed are dropped -
+    only the newest is processed next. If a frame barely differs from the
+    last analysed one, its detections are reused without running YOLO.
+    Every processed frame gets one JSON message back:
+    ``{"frame", "items", "reused", "dropped", "latency_ms"}``.
+    """
+    await websocket.accept()
+    latest = LatestFrame()
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                frame = message.get("bytes")
+                if frame and len(frame) <= LIVE_MAX_FRAME_BYTES:
+                    latest.put(frame)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            latest.close()
+
+    receiver = asyncio.create_task(receive_frames())
+    last_signature = None
+    last_items = []
+
+    try:
+        while True:
+            next_frame = await latest.get()
+            if next_frame is None:
+                break
+            seq, frame = next_frame
+            started = time.perf_counter()
+
+            try:
+                signature = await asyncio.to_thread(frame_signature, frame, max_pixels=UPLOAD_MAX_PIXELS)
+            except ImageTooLarge as e:
+                await websocket.send_json({"frame": seq, "error": str(e)})
+                continue
+            except Exception:
+                await websocket.send_json({"frame": seq, "error": "Unreadable frame"})
+                continue
+
+            reused = (
+                last_signature is not None
+                and frame_difference(signature, last_signature) < LIVE_DIFF_THRESHOLD
             )
-        elif bin_suggestion == "organic":
-            response += "This will decompose naturally and can be turned into nutrient-rich compost."
-        else:  # reuse
-            response += "Consider repurposing this item before disposal to extend its lifecycle."
+            if not reused:
+                if model_status["state"] == "loading":
+                    await websocket.send_json({"frame": seq, "error": "Model is still loading"})
+                    continue
+                try:
+                    response = await detect_batcher.submit((frame, f"live-{seq}", None))
+                except InferenceQueueFull as e:
+                    await websocket.send_json(
+                        {"frame": seq, "error": "busy", "retryAfter": e.retry_after}
+                    )
+                    continue
+                last_items = response.model_dump()["items"]
+                last_signature = signature
+
+            await websocket.send_json(
+                {
+                    "frame": seq,
+                    "items": last_items,
+                    "reused": reused,
+                    "dropped": latest.dropped,
+                    "latency_ms": round(1000 * (time.perf_counter() - started), 1),
+                }
+            )
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+
+
+# ─────────────────────────────────────────────────────────────
+# Model Admin (hot swap, shadow / A-B candidates, per-model stats)
+# ─────────────────────────────────────────────────────────────
+
+# Admin endpoints are disabled unless ADMIN_TOKEN is set; requests then
+# need a matching X-Admin-Token header
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+MODELS_DIR = Path(__file__).resolve().parent / "models"
+SWAP_MODES = ("swap",) + CANDIDATE_MODES
+
+# Changes are recorded as a desired state every worker reconciles to. serve.py
+# points MODEL_CONTROL_FILE at a file its workers share; otherwise it's in memory.
+MODEL_CONTROL_FILE = os.getenv("MODEL_CONTROL_FILE")
+MODEL_CONTROL_POLL_S = float(os.getenv("MODEL_CONTROL_POLL_S", 1.0))
+model_control = (
+    ControlFile(MODEL_CONTROL_FILE, stale_after=max(10.0, 5 * MODEL_CONTROL_POLL_S))
+    if MODEL_CONTROL_FILE
+    else ModelControl()
+)
+reconcile_lock = threading.Lock()
+applied_generation = 0  # last ModelControl generation this process applied
+
+
+class ModelLoadRequest(BaseModel):
+    path: str  # weights file under models/, e.g. "best-v2.pt"
+    backend: str = None  # default INFERENCE_BACKEND
+    mode: str = "swap"  # "swap", "shadow" or "split"
+    fraction: float = 0.1  # share of batches the candidate sees (shadow/split)
+
+
+def require_admin(token: str):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ADMIN_TOKEN).")
+    # Constant-time comparison: == returns at the first differing character
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
+
+
+def resolve_weights(path: str) -> Path:
+    """Weights path under models/ - anything outside it is refused"""
+    resolved = (MODELS_DIR / path).resolve()
+    if not resolved.is_relative_to(MODELS_DIR):
+        raise HTTPException(status_code=400, detail="Weights must be inside the models/ directory.")
+    if not resolved.is_file():
+        raise HTTPException(status_code=404, detail=f"No weights file at models/{path}.")
+    return resolved
+
+
+def current_spec() -> dict:
+    """Desired state matching this process's registry - the starting point of the first change"""
+    active, candidate = registry.active, registry.candidate
+    return {
+        "active": active.spec() if active else None,
+        "candidate": (
+            dict(candidate.spec(), mode=registry.mode, fraction=registry.fraction) if candidate else None
+        ),
+    }
+
+
+def reconcile(state: dict):
+    """
+    Bring this process's registry to a ModelControl ``state``: weights that
+    are already loaded (active, or the candidate being promoted) are reused,
+    anything else is loaded and warmed up first. Blocking - runs on its own
+    thread, never on the inference executor, so detection keeps going.
+    """
+    global applied_generation
+    with reconcile_lock:
+        if state["generation"] == applied_generation:
+            return
+        registry.loading = {"generation": state["generation"], "state": "loading", "error": None}
+        try:
+            wanted = state["active"]
+            if wanted and not same_weights(wanted, registry.active):
+                if same_weights(wanted, registry.candidate):
+                    version = registry.candidate  # promote: already loaded and warm
+                else:
+                    version = load_version(Path(wanted["path"]), wanted["backend"])
+                activate(version)
+
+            wanted = state["candidate"]
+            if wanted is None:
+                registry.clear_candidate()
+            else:
+                version = registry.candidate
+                if not same_weights(wanted, version):
+                    version = load_version(Path(wanted["path"]), wanted["backend"])
+                registry.set_candidate(version, wanted["mode"], wanted["fraction"])
+                logger.info(f"🧪 Candidate {version.name} staged ({wanted['mode']}, {wanted['fraction']:.0%} of batches)")
+            registry.loading.update(state="done")
+        except Exception as e:
+            logger.exception(f"❌ Applying model change {state['generation']} failed: {e}")
+            registry.loading.update(state="failed", error=str(e))
+        finally:
+            applied_generation = state["generation"]
+
+
+async def change_models(change) -> dict:
+    """
+    Record a change of the desired models and start applying it here; other
+    workers pick it up from the control file within MODEL_CONTROL_POLL_S.
+    The control file's lock and I/O run off the event loop.
+    """
+    if model_status["state"] == "loading":
+        raise HTTPException(status_code=409, detail="Model is still loading, please retry shortly.")
+
+    def guarded(state):
+        # Checked under the control lock, so two calls can't both pass it
+        if reconcile_lock.locked() or state.get("generation", applied_generation) != applied_generation:
+            raise HTTPException(status_code=409, detail="Another model change is still being applied.")
+        change(state)
+
+    state = await asyncio.to_thread(model_control.update, guarded, current_spec())
+    app.state.model_change = asyncio.create_task(asyncio.to_thread(reconcile, state))
+    return state
+
+
+async def watch_model_control():
+    """Per worker: apply changes other workers recorded, and publish this worker's stats"""
+    while True:
+        await asyncio.sleep(MODEL_CONTROL_POLL_S)
+        try:
+            if model_status["state"] == "loading":
+                continue
+            state = await asyncio.to_thread(model_control.read)
+            if state and state["generation"] != applied_generation and not reconcile_lock.locked():
+                await asyncio.to_thread(reconcile, state)
+            await asyncio.to_thread(model_control.publish_status, os.getpid(), worker_status())
+        except Exception as e:
+            logger.warning(f"Model control check failed: {e}")
+
+
+def worker_status() -> dict:
+    return dict(registry.stats(), generation=applied_generation)
 
+
+@app.get("/admin/models")
+def admin_models(x_admin_token: str = Header(None)):
+    """
+    Desired models, and per worker the active, candidate and draining
+    models: load time, warmup, memory and rolling latency
+    """
+    require_admin(x_admin_token)
+    model_control.publish_status(os.getpid(), worker_status())
+    return {"desired": model_control.read(), "workers": model_control.statuses()}
+
+
+@app.post("/admin/models/load", status_code=202)
+async def admin_load_model(request: ModelLoadRequest, x_admin_token: str = Header(None)):
+    """
+    Load ``path`` in the background, in every worker. ``swap`` publishes it
+    once warmed up (in-flight requests finish on the old model);
+    ``shadow``/``split`` stage it as a candidate for ``fraction`` of
+    batches instead.
+    """
+    require_admin(x_admin_token)
+    if request.mode not in SWAP_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(SWAP_MODES)}.")
+    if not 0 <= request.fraction <= 1:
+        raise HTTPException(status_code=400, detail="fraction must be between 0 and 1.")
+    spec = {"path": str(resolve_weights(request.path)), "backend": request.backend}
+
+    def change(state):
+        if request.mode == "swap":
+            state["active"] = spec
+        else:
+            state["candidate"] = dict(spec, mode=request.mode, fraction=request.fraction)
+
+    return await change_models(change)
+
+
+@app.post("/admin/models/promote", status_code=202)
+async def admin_promote_candidate(x_admin_token: str = Header(None)):
+    """Make the shadow/split candidate the active model"""
+    require_admin(x_admin_token)
+
+    def change(state):
+        if state["candidate"] is None:
+            raise HTTPException(status_code=404, detail="No candidate model to promote.")
+        state["active"] = {"path": state["candidate"]["path"], "backend": state["candidate"]["backend"]}
+        state["candidate"] = None
+
+    return await change_models(change)
+
+
+@app.delete("/admin/models/candidate", status_code=202)
+async def admin_drop_candidate(x_admin_token: str = Header(None)):
+    """Stop shadowing / splitting traffic; the candidate is freed once idle"""
+    require_admin(x_admin_token)
+
+    def change(state):
+        if state["candidate"] is None:
+            raise HTTPException(status_code=404, detail="No candidate model loaded.")
+        state["candidate"] = None
+
+    return await change_models(change)
+
+
+# ─────────────────────────────────────────────────────────────
+# Chat Endpoint (MODIFIED FOR YOUR 3 CATEGORIES)
+# ─────────────────────────────────────────────────────────────
+
+
+# Item catalogue shared with the frontend; /chat answers from it plus the tips above
+CHAT_CATALOGUE = os.getenv(
+    "CHAT_CATALOGUE",
+    str(Path(__file__).resolve().parent.parent / "frontend" / "src" / "data" / "wasteData.js"),
+)
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", 1024))  # 0 disables
+
+knowledge_base = KnowledgeBase.from_sources(
+    RECYCLING_TIPS,
+    [item.model_dump() for item in FALLBACK_DEMO_RESPONSE.items],
+    CHAT_CATALOGUE,
+    cache_size=CHAT_CACHE_SIZE,
+)
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat_assistant(request: ChatRequest):
+    """
+    Answer waste questions from the local knowledge index - no external LLM.
+    Lookups take microseconds, so they run directly on the event loop.
+    """
+    try:
+        response, bin_suggestion = knowledge_base.answer(request.query)
         return ChatResponse(response=response, binSuggestion=bin_suggestion)
     except Exception as e:
-        print(f"❌ Chat Assistant Error: {e}")
+        logger.exception(f"❌ Chat Assistant Error: {e}")
         return ChatResponse(
             response="I'm here to help with waste segregation questions. How can I assist you today?",
-            binSuggestion="reuse",
+            binSuggestion="Recycle",
         )
 
 
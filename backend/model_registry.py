@@ -0,0 +1,346 @@
+"""
+Hot-swappable models with per-model resource accounting.
+
+``ModelVersion`` bundles everything detection needs from one set of weights
+- the model, its ClassTable, the cascade stage - so a request that picked a
+version keeps using one consistent set even if a swap lands mid-request.
+
+``ModelRegistry`` holds the active version and, optionally, a candidate:
+
+- **swap**: ``active`` is replaced by one reference assignment. Requests
+  that already hold the old version finish on it; it's freed once the last
+  of them lets go (until then it's listed as draining).
+- **shadow**: a ``fraction`` of batches is also run on the candidate after
+  the active model answered. Its results are thrown away - only its
+  latency is recorded, for a like-for-like comparison on real traffic.
+- **split**: a ``fraction`` of batches is *answered* by the candidate (A/B).
+
+Each version records its load time, warmup, memory footprint and a rolling
+window of forward-pass latencies, reported by ``stats()``.
+
+Admin changes don't touch a registry directly: they update the *desired*
+state in a ``ModelControl`` and every serving process reconciles its own
+registry to it. In one process that state lives in memory; pre-forked
+workers (serve.py) share a ``ControlFile``, so a swap sent to any worker
+reaches all of them, and each worker publishes its stats next to it.
+"""
+
+import contextlib
+import copy
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no pre-fork workers, so no cross-process locking needed
+    fcntl = None
+
+import numpy as np
+
+CANDIDATE_MODES = ("shadow", "split")
+
+
+def parameter_bytes(model):
+    """Size of a PyTorch model's parameters and buffers, or None (exported backends)"""
+    try:
+        module = model.model
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return None
+
+
+def process_rss():
+    """Resident memory of this process in bytes (Linux), or None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class LatencyWindow:
+    """Rolling forward-pass timings: (seconds, images) for the last ``size`` calls"""
+
+    def __init__(self, size: int = 1024):
+        self._calls = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._total_calls = 0
+        self._total_images = 0
+
+    def observe(self, seconds: float, images: int = 1):
+        with self._lock:
+            self._calls.append((seconds, images))
+            self._total_calls += 1
+            self._total_images += images
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = list(self._calls)
+            total_calls, total_images = self._total_calls, self._total_images
+        if not calls:
+            return {"calls": total_calls, "images": total_images}
+        seconds = np.array([s for s, _ in calls])
+        images = sum(n for _, n in calls)
+        return {
+            "calls": total_calls,
+            "images": total_images,
+            "call_ms_p50": round(1000 * float(np.quantile(seconds, 0.5)), 2),
+            "call_ms_p95": round(1000 * float(np.quantile(seconds, 0.95)), 2),
+            "image_ms_avg": round(1000 * float(seconds.sum()) / images, 2),
+        }
+
+
+@dataclass(eq=False)
+class ModelVersion:
+    """One loaded, warmed-up set of weights and everything derived from it"""
+
+    name: str
+    model: object
+    table: object  # postprocess.ClassTable
+    path: Path
+    backend: str
+    cache_id: str  # DetectionCache.model_id for results of this version
+    load_ms: float = 0.0
+    warmup_ms: list = field(default_factory=list)
+    fast_model: object = None  # cascade first stage, if any
+    fast_name: str = None
+    parameters_bytes: int = None
+    rss_delta_bytes: int = None
+    requested_backend: str = None  # as asked for; ``backend`` is what actually loaded
+    loaded_at: float = field(default_factory=time.time)
+    latency: LatencyWindow = field(default_factory=LatencyWindow)
+
+    def spec(self) -> dict:
+        """What to load to get this version again - compared against ModelControl specs"""
+        return {"path": str(self.path), "backend": self.requested_backend}
+
+    def stats(self) -> dict:
+        def mb(value):
+            return None if value is None else round(value / (1024 * 1024), 1)
+
+        return {
+            "name": self.name,
+            "path": str(self.path),
+            "backend": self.backend,
+            "cascade": self.fast_name,
+            "load_ms": self.load_ms,
+            "warmup_ms": self.warmup_ms,
+            "parameters_mb": mb(self.parameters_bytes),
+            "rss_delta_mb": mb(self.rss_delta_bytes),
+            "loaded_at": round(self.loaded_at, 3),
+            "latency": self.latency.stats(),
+        }
+
+
+class ModelRegistry:
+    """Active version, optional candidate (shadow or A/B split), and swap bookkeeping"""
+
+    def __init__(self):
+        self.active = None
+        self.candidate = None
+        self.mode = None
+        self.fraction = 0.0
+        self.loading = None  # {"generation", "state", "error"} of the last ModelControl change applied
+        self._lock = threading.Lock()
+        self._draining = weakref.WeakSet()  # swapped-out versions still held by requests
+
+    def publish(self, version: ModelVersion):
+        """Make ``version`` active; returns the previous active version"""
+        with self._lock:
+            previous, self.active = self.active, version
+            if self.candidate is version:
+                self.candidate, self.mode, self.fraction = None, None, 0.0
+            if previous is not None:
+                self._draining.add(previous)
+        return previous
+
+    def set_candidate(self, version: ModelVersion, mode: str, fraction: float):
+        if mode not in CANDIDATE_MODES:
+            raise ValueError(f"mode must be one of {', '.join(CANDIDATE_MODES)}")
+        with self._lock:
+            self.candidate = version
+            self.mode = mode
+            self.fraction = min(max(fraction, 0.0), 1.0)
+
+    def clear_candidate(self):
+        with self._lock:
+            dropped, self.candidate, self.mode, self.fraction = self.candidate, None, None, 0.0
+        return dropped
+
+    def route(self):
+        """
+        ``(serving, shadow)`` versions for one batch. ``serving`` answers;
+        ``shadow`` (or None) should also run, with its results discarded.
+        """
+        with self._lock:
+            active, candidate, mode, fraction = self.active, self.candidate, self.mode, self.fraction
+        if candidate is None or random.random() >= fraction:
+            return active, None
+        if mode == "split":
+            return candidate, None
+        return active, candidate
+
+    def stats(self) -> dict:
+        with self._lock:
+            active, candidate = self.active, self.candidate
+            mode, fraction, loading = self.mode, self.fraction, self.loading
+            draining = [v for v in self._draining if v is not active]
+        rss = process_rss()
+        return {
+            "active": active.stats() if active else None,
+            "candidate": dict(candidate.stats(), mode=mode, fraction=fraction) if candidate else None,
+            "draining": [v.name for v in draining],
+            "loading": loading,
+            "rss_mb": round(rss / (1024 * 1024), 1) if rss else None,
+        }
+
+
+def same_weights(spec: dict, version: ModelVersion) -> bool:
+    """Whether ``version`` was loaded from the path and backend in ``spec``"""
+    if version is None or spec is None:
+        return False
+    ours = version.spec()
+    return spec["path"] == ours["path"] and spec["backend"] == ours["backend"]
+
+
+class ModelControl:
+    """
+    Desired model state shared by every process serving the app:
+    ``{"generation": n, "active": spec, "candidate": spec or None}``, a spec
+    being ``{"path", "backend"}`` (plus ``mode`` and ``fraction`` for the
+    candidate). Every ``update`` bumps the generation.
+
+    This base class keeps the state in memory, for a single process.
+    """
+
+    def __init__(self):
+        self._state = None
+        self._statuses = {}
+        self._lock = threading.Lock()
+
+    def read(self):
+        """Current desired state, or None before the first change"""
+        return self._state
+
+    def update(self, change, initial: dict) -> dict:
+        """
+        Apply ``change(state)`` (it edits the dict in place, or raises to
+        abort) to the current state - ``initial`` if there is none yet - and
+        store the result under the next generation.
+        """
+        with self._lock, self._locked():
+            current = self._load()
+            state = copy.deepcopy(current or initial)
+            change(state)
+            state["generation"] = (current or {}).get("generation", 0) + 1
+            self._store(state)
+            return state
+
+    def publish_status(self, worker: int, status: dict):
+        """Record one worker's registry stats for ``statuses``"""
+        self._statuses = {worker: status}
+
+    def statuses(self) -> dict:
+        """``{worker pid: stats}`` of every live worker"""
+        return dict(self._statuses)
+
+    def _locked(self):
+        return contextlib.nullcontext()
+
+    def _load(self):
+        return self._state
+
+    def _store(self, state: dict):
+        self._state = state
+
+
+class ControlFile(ModelControl):
+    """
+    ModelControl in a JSON file shared by pre-forked workers. Updates are
+    serialized with an flock and written atomically (temp file + rename);
+    each worker's status goes to ``<file>.<pid>.status``.
+
+    Args:
+        path: The control file; created on the first update.
+        stale_after: Status files older than this many seconds belong to
+            workers that died and are ignored (and removed).
+    """
+
+    def __init__(self, path, stale_after: float = 10.0):
+        super().__init__()
+        self.path = Path(path)
+        self.stale_after = stale_after
+
+    def read(self):
+        return self._load()
+
+    def publish_status(self, worker: int, status: dict):
+        self._write_json(self._status_path(worker), dict(status, updated_at=round(time.time(), 3)))
+
+    def statuses(self) -> dict:
+        statuses = {}
+        now = time.time()
+        for path in self.path.parent.glob(f"{self.path.name}.*.status"):
+            try:
+                status = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if now - status.get("updated_at", 0) > self.stale_after:
+                path.unlink(missing_ok=True)
+                continue
+            statuses[int(path.name.split(".")[-2])] = status
+        return statuses
+
+    def remove(self):
+        """Delete the control, lock and status files (server shutdown)"""
+        for path in self.path.parent.glob(f"{self.path.name}*"):
+            path.unlink(missing_ok=True)
+
+    def _status_path(self, worker: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{worker}.status")
+
+    def _locked(self):
+        return _FileLock(self.path.with_name(self.path.name + ".lock"))
+
+    def _load(self):
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, state: dict):
+        self._write_json(self.path, state)
+
+    @staticmethod
+    def _write_json(path: Path, data: dict):
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temporary.write_text(json.dumps(data))
+        os.replace(temporary, path)
+
+
+class _FileLock:
+    """Exclusive flock on ``path`` for the duration of a with-block"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+        return False
@@ -0,0 +1,131 @@
+"""
+Array-level post-processing of YOLO results.
+
+Everything that only depends on the class id - frontend bin, recycling tip,
+display name, metadata blurbs, "ignore people" filter - is computed once per
+model in a ``ClassTable``. Per image, the raw ``result.boxes`` tensor is
+moved to numpy in one transfer, filtered on confidence and class in one
+pass, and only the top-k survivors are turned into response objects.
+"""
+
+import numpy as np
+
+# Frontend expects: "Recycle", "Organic", "Landfill", "Hazardous"
+# More flexible category mapping to handle various model class names
+BIN_ALIASES = [
+    ("Recycle", ["recyclable", "recycle", "recycling", "recyclables"]),
+    ("Organic", ["organic", "organics", "compost", "food-waste", "bio"]),
+    ("Recycle", ["reuse", "reusable", "reusables"]),  # Reusable items go to Recycle bin
+    ("Hazardous", ["hazardous", "toxic", "dangerous", "chemical"]),
+]
+BIN_BY_CLASS_NAME = {
+    alias: bin_name for bin_name, aliases in BIN_ALIASES for alias in aliases
+}
+FALLBACK_BIN = "Landfill"
+
+# 🛑 EXPLICIT FILTER: Ignore people
+IGNORED_CLASSES = {"person", "face", "hand", "man", "woman"}
+
+DEFAULT_TIP = "Dispose properly in appropriate bin."
+
+
+def class_metadata(class_name: str, tip: str) -> dict:
+    return {
+        "transformation": f"Processed into raw material for new {class_name} products.",
+        "impact": f"Recycling {class_name} reduces landfill waste and conserves resources.",
+        "fun_fact": f"{class_name.capitalize()} waste can be transformed into useful products!",
+        "recycling_tips": tip,
+    }
+
+
+class ClassTable:
+    """
+    Per-class lookup tables built once from ``model.names``.
+
+    Args:
+        names: ``{class_id: name}`` as exposed by ultralytics models.
+        tips: Recycling tip per (lower-case) class name.
+    """
+
+    def __init__(self, names: dict, tips: dict):
+        size = max(names) + 1 if names else 0
+        self.names = [""] * size
+        self.item_types = [""] * size
+        self.bins = [FALLBACK_BIN] * size
+        self.metadata = [{}] * size
+        self.ignored = np.zeros(size, dtype=bool)
+
+        for class_id, raw_name in names.items():
+            class_name = raw_name.lower()
+            self.names[class_id] = class_name
+            self.item_types[class_id] = class_name.capitalize()
+            self.bins[class_id] = BIN_BY_CLASS_NAME.get(class_name.strip(), FALLBACK_BIN)
+            self.metadata[class_id] = class_metadata(
+                class_name, tips.get(class_name, DEFAULT_TIP)
+            )
+            self.ignored[class_id] = class_name in IGNORED_CLASSES
+
+    def unknown_classes(self) -> list:
+        """Class names that fall back to Landfill, worth a warning at load time"""
+        return [
+            name
+            for name, bin_name in zip(self.names, self.bins)
+            if name and bin_name == FALLBACK_BIN and name not in IGNORED_CLASSES
+        ]
+
+
+def boxes_to_numpy(boxes) -> np.ndarray:
+    """``(n, 6)`` array of x1, y1, x2, y2, conf, cls in one device->host copy"""
+    data = boxes.data
+    if hasattr(data, "cpu"):
+        data = data.cpu().numpy()
+    return np.asarray(data, dtype=np.float32).reshape(-1, 6)
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (n, 4) and (m, 4) xyxy arrays"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def select_top_k(
+    data: np.ndarray,
+    table: ClassTable,
+    conf_threshold: float = 0.30,
+    top_k: int = 3,
+    boost: float = 1.1,
+    max_conf: float = 0.95,
+):
+    """
+    Pick the ``top_k`` detections from an ``(n, 6)`` box array.
+
+    Returns ``(rows, ranks, confidences)``: the selected rows, each row's
+    1-based position among the boxes that passed the filters (the item id)
+    and its reported (boosted, capped) confidence - best first. Ties keep
+    box order, exactly like a stable sort over every box would.
+    """
+    conf = data[:, 4]
+    cls = data[:, 5].astype(np.intp)
+
+    known = (cls >= 0) & (cls < len(table.ignored))
+    keep = known & (conf >= conf_threshold)
+    keep[keep] = ~table.ignored[cls[keep]]
+    kept = np.flatnonzero(keep)
+    if kept.size == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return data[:0], empty, np.empty(0, dtype=np.float64)
+
+    reported = np.minimum(conf[kept].astype(np.float64) * boost, max_conf)
+    positions = np.arange(kept.size)
+
+    if kept.size > top_k:
+        # Partial sort: everything tied with the k-th best stays a candidate
+        kth = np.partition(reported, kept.size - top_k)[kept.size - top_k]
+        positions = positions[reported >= kth]
+
+    order = positions[np.lexsort((positions, -reported[positions]))][:top_k]
+    return data[kept[order]], order + 1, reported[order]
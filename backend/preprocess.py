@@ -0,0 +1,117 @@
+"""
+Image preprocessing for the detection pipeline.
+
+Phone photos arrive at 12+ MP but YOLO letterboxes them down to ~640 px.
+Decoding and RGB-converting the full frame wastes most of the decode time
+and memory, so ``prepare_image``:
+
+1. asks the JPEG decoder for a reduced-scale decode (``Image.draft``),
+2. resizes to the model input size *before* converting to RGB,
+3. applies the EXIF orientation on the small image,
+
+and remembers the scale factors so boxes can be mapped back into the
+coordinates of the original (orientation-corrected) photo - which is what
+the browser shows and what ``ScanScreen.jsx`` draws its overlay on.
+"""
+
+import io
+from dataclasses import dataclass
+
+from PIL import Image
+
+EXIF_ORIENTATION = 0x0112
+
+# EXIF orientation -> transpose that brings the pixels upright
+# (same table as PIL.ImageOps.exif_transpose)
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+# Orientations that swap width and height
+SWAPS_AXES = {5, 6, 7, 8}
+
+
+@dataclass
+class PreparedImage:
+    """A model-ready RGB image plus what's needed to map boxes back"""
+
+    image: Image.Image
+    original_size: tuple  # (w, h) of the upright full-resolution photo
+    scale_x: float = 1.0  # original px per model-input px
+    scale_y: float = 1.0
+
+
+class ImageTooLarge(ValueError):
+    """The header declares more pixels than allowed - raised before decoding any"""
+
+
+def open_image(image_bytes: bytes, max_pixels: int = None) -> Image.Image:
+    """
+    Open ``image_bytes`` lazily (only the header is parsed) and refuse
+    decompression bombs: a few KB of PNG/WebP can declare gigapixels.
+    ``bytes`` are read in place - BytesIO shares rather than copies them.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    w, h = img.size
+    if max_pixels and w * h > max_pixels:
+        raise ImageTooLarge(
+            f"Image is {w}x{h} ({w * h / 1e6:.1f} MP), the limit is {max_pixels / 1e6:.1f} MP."
+        )
+    return img
+
+
+def prepare_image(image_bytes: bytes, target_size: int = 640, max_pixels: int = None) -> PreparedImage:
+    """
+    Decode ``image_bytes`` into an upright RGB image whose longest side is
+    at most ``target_size``. Raises ImageTooLarge over ``max_pixels``, and
+    whatever PIL raises on bad input.
+    """
+    img = open_image(image_bytes, max_pixels)
+    orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+
+    raw_w, raw_h = img.size
+    if orientation in SWAPS_AXES:
+        original_size = (raw_h, raw_w)
+    else:
+        original_size = (raw_w, raw_h)
+
+    # JPEG only: decode at 1/2, 1/4 or 1/8 scale, never below target_size.
+    # draft() keeps *both* sides at least the requested size, so it gets the
+    # aspect-preserved target - a square box would pin the short side instead.
+    if img.format == "JPEG" and max(raw_w, raw_h) > target_size:
+        ratio = target_size / max(raw_w, raw_h)
+        img.draft("RGB", (max(1, round(raw_w * ratio)), max(1, round(raw_h * ratio))))
+
+    # Palette images must not be interpolated as indices
+    if img.mode == "P":
+        img = img.convert("RGBA")
+
+    w, h = img.size
+    longest = max(w, h)
+    if longest > target_size:
+        ratio = target_size / longest
+        img = img.resize(
+            (max(1, round(w * ratio)), max(1, round(h * ratio))),
+            Image.Resampling.BILINEAR,
+            reducing_gap=3.0,
+        )
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    transpose = ORIENTATION_TRANSPOSE.get(orientation)
+    if transpose is not None:
+        img = img.transpose(transpose)
+
+    return PreparedImage(
+        image=img,
+        original_size=original_size,
+        scale_x=original_size[0] / img.width,
+        scale_y=original_size[1] / img.height,
+    )
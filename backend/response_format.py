@@ -0,0 +1,132 @@
+"""
+Compact and binary encodings of detection responses.
+
+The default ``/detect`` body repeats each item's bin and metadata blurbs in
+every item. ``format=compact`` sends them once per category instead:
+
+    {"categories": {"Plastic_bottle": {"bin": "Recycle", "metadata": {...}}},
+     "items": [{"id": 1, "itemType": "Plastic_bottle", "confidence": 0.95,
+                "contaminated": false, "bbox": [x, y, w, h]}]}
+
+``fields=`` keeps only the listed item fields (in either format), and
+``format=msgpack`` - or ``Accept: application/msgpack`` - is the compact
+shape as MessagePack. The shaping works on the plain dict of a full
+response, so cached payloads can be re-shaped without running the model.
+
+JSON is encoded with orjson when it's installed (stdlib json otherwise);
+MessagePack needs the ``msgpack`` package.
+"""
+
+import json
+from dataclasses import dataclass
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPE = "application/msgpack"
+MSGPACK_ACCEPT = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+FORMATS = ("full", "compact", "msgpack")
+ITEM_FIELDS = ("id", "itemType", "bin", "contaminated", "confidence", "bbox", "metadata")
+CATEGORY_FIELDS = ("bin", "metadata")  # moved to the per-category table in compact form
+
+
+class FormatError(ValueError):
+    """Unknown format or field, or an encoding whose package isn't installed"""
+
+
+def dumps(obj) -> bytes:
+    """Fast JSON encoding of plain dicts/lists"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@dataclass(frozen=True)
+class ResponseFormat:
+    compact: bool = False
+    binary: bool = False
+    fields: tuple = ITEM_FIELDS
+
+    @property
+    def is_default(self) -> bool:
+        """Plain full JSON - the model's own serializer (or the cached bytes) can be used as-is"""
+        return not self.compact and not self.binary and self.fields == ITEM_FIELDS
+
+    @property
+    def media_type(self) -> str:
+        return MSGPACK_TYPE if self.binary else JSON_TYPE
+
+    def shape(self, response: dict) -> dict:
+        """Re-shape a full response dict (``{"items": [...], ...}``); other keys are kept"""
+        if not self.compact:
+            items = [{k: item[k] for k in self.fields} for item in response["items"]]
+            return {**response, "items": items}
+
+        item_fields = [k for k in self.fields if k not in CATEGORY_FIELDS and k != "itemType"]
+        category_fields = [k for k in CATEGORY_FIELDS if k in self.fields]
+        categories, items = {}, []
+        for item in response["items"]:
+            key = item["itemType"]
+            if key not in categories:
+                categories[key] = {k: item[k] for k in category_fields}
+            row = {"itemType": key}
+            for k in item_fields:
+                row[k] = item[k]
+            if "bbox" in row:
+                box = row["bbox"]
+                row["bbox"] = [box["x"], box["y"], box["w"], box["h"]]
+            items.append(row)
+
+        shaped = {**response, "items": items}
+        if category_fields:
+            shaped["categories"] = categories
+        return shaped
+
+    def encode(self, response: dict) -> bytes:
+        shaped = self.shape(response)
+        if self.binary:
+            return msgpack.packb(shaped, use_bin_type=True)
+        return dumps(shaped)
+
+
+def negotiate(format: str = None, fields: str = None, accept: str = None) -> ResponseFormat:
+    """
+    ResponseFormat from the ``format``/``fields`` query parameters and the
+    Accept header. An explicit ``format`` wins over Accept, and Accept only
+    selects msgpack when it's installed (otherwise JSON is sent).
+    """
+    if format is None:
+        wants_msgpack = bool(accept) and any(t in accept for t in MSGPACK_ACCEPT)
+        format = "msgpack" if wants_msgpack and msgpack is not None else "full"
+    if format not in FORMATS:
+        raise FormatError(f"format must be one of {', '.join(FORMATS)}.")
+    if format == "msgpack" and msgpack is None:
+        raise FormatError("msgpack responses need the msgpack package on the server.")
+
+    selected = ITEM_FIELDS
+    if fields:
+        selected = tuple(f.strip() for f in fields.split(",") if f.strip())
+        unknown = [f for f in selected if f not in ITEM_FIELDS]
+        if unknown:
+            raise FormatError(
+                f"Unknown fields: {', '.join(unknown)}. Choose from {', '.join(ITEM_FIELDS)}."
+            )
+
+    return ResponseFormat(
+        compact=format != "full", binary=format == "msgpack", fields=selected
+    )
@@ -0,0 +1,156 @@
+"""
+Production server: pre-fork workers sharing one copy of the model.
+
+``python main.py`` is the development server (single process, auto-reload).
+In production run ``python serve.py`` instead:
+
+1. the parent loads and warms up the model once (single-threaded, so no
+   OpenMP pool exists at fork time) and freezes the GC so collections in the
+   children don't touch - and un-share - the parent's objects,
+2. it binds the listening socket and forks SERVE_WORKERS children, which
+   share the weights copy-on-write and serve from the inherited socket,
+3. each child sets its own torch thread count, and crashed children are
+   respawned,
+4. admin model changes go through a control file all workers share
+   (MODEL_CONTROL_FILE), so a swap made on one worker reaches every worker.
+
+Every process logs its memory (RSS vs. PSS, shared vs. private) so the
+saving over N independent copies is visible.
+"""
+
+import gc
+import os
+import signal
+import socket
+import tempfile
+
+import uvicorn
+
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", os.cpu_count() or 1))
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", 1))  # intra-op threads per worker
+
+
+def memory_usage(pid="self") -> dict:
+    """RSS/PSS/shared/private memory in MB from /proc/<pid>/smaps_rollup (Linux)"""
+    fields = {
+        "Rss": "rss_mb",
+        "Pss": "pss_mb",
+        "Shared_Clean": "shared_mb",
+        "Shared_Dirty": "shared_mb",
+        "Private_Clean": "private_mb",
+        "Private_Dirty": "private_mb",
+    }
+    usage = dict.fromkeys(fields.values(), 0.0)
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in fields:
+                    usage[fields[key]] += int(rest.split()[0]) / 1024
+    except OSError:
+        return {}
+    return {key: round(value, 1) for key, value in usage.items()}
+
+
+def set_torch_threads(threads: int):
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def run_worker(index: int, sock: socket.socket, host: str, port: int):
+    """Child process: finish warming up and serve from the shared socket"""
+    import main
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+
+    set_torch_threads(TORCH_THREADS)
+    if main.registry.active is not None:
+        # Spins up this worker's own intra-op thread pool
+        main.warm_up(main.registry.active.model)
+
+    print(f"👷 Worker {index} (pid {os.getpid()}) ready: {memory_usage()}")
+    config = uvicorn.Config(main.app, host=host, port=port)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(host: str = "0.0.0.0", port: int = 8000, workers: int = SERVE_WORKERS):
+    if not hasattr(os, "fork") or workers <= 1:
+        # Windows, or nothing to share: plain single-process server
+        uvicorn.run("main:app", host=host, port=port)
+        return
+
+    # Set before main is imported - it picks the control file up at import
+    os.environ.setdefault(
+        "MODEL_CONTROL_FILE", os.path.join(tempfile.gettempdir(), f"waste-models-{os.getpid()}.json")
+    )
+    import main
+
+    baseline = memory_usage()
+    set_torch_threads(1)
+    main.initialize_model()
+    loaded = memory_usage()
+    print(f"🧠 Parent (pid {os.getpid()}) before load: {baseline}, after load: {loaded}")
+    if main.model_status["state"] != "ready":
+        print(f"⚠️ Model not ready ({main.model_status['error']}), workers will start anyway")
+
+    # Objects allocated so far live in a permanent generation the GC never
+    # scans, so the children's collections don't copy their pages.
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children = {}
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(index, sock, host, port)
+            finally:
+                os._exit(0)
+        children[pid] = index
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"🚀 Serving on {host}:{port} with {workers} workers x {TORCH_THREADS} torch threads")
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"⚠️ Worker {index} (pid {pid}) exited with {status}, respawning")
+            spawn(index)
+
+    sock.close()
+    main.model_control.remove()
+
+
+if __name__ == "__main__":
+    # Use PORT from environment (Render requirement) or default to 8000
+    serve(port=int(os.getenv("PORT", 8000)))
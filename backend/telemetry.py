@@ -0,0 +1,308 @@
+"""
+Non-blocking structured logging and Prometheus metrics.
+
+Logging: ``setup_logging`` puts a ``QueueHandler`` on the root logger, so a
+log call only enqueues the record; a ``QueueListener`` thread formats it
+(JSON lines by default) and does the file/stderr I/O off the request path.
+
+Metrics: tiny dependency-free Counter/Gauge/Histogram types rendered in the
+Prometheus text exposition format by ``MetricsRegistry.render()``. They are
+per process - behind ``serve.py`` each worker exposes its own numbers.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+# ─────────────────────────────────────────────────────────────
+# Logging
+# ─────────────────────────────────────────────────────────────
+
+# Attributes every LogRecord has; anything else was passed via extra={...}
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg and any ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def setup_logging(level: str = "INFO", log_file: str = None, fmt: str = "json"):
+    """
+    Route all logging through a queue to a background writer thread.
+
+    Args:
+        level: Root log level name (DEBUG, INFO, WARNING...).
+        log_file: File to append to; stderr when empty.
+        fmt: "json" for structured lines, "text" for the classic format.
+    """
+    handler = logging.FileHandler(log_file) if log_file else logging.StreamHandler()
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level.upper())
+
+    listener.start()
+    atexit.register(listener.stop)
+    if hasattr(os, "register_at_fork"):
+        # Threads don't survive fork(): give pre-forked workers their own writer
+        os.register_at_fork(after_in_child=lambda: _restart_listener(listener))
+    return listener
+
+
+def _restart_listener(listener: logging.handlers.QueueListener):
+    # Records still queued at fork time are the parent's to write
+    while True:
+        try:
+            listener.queue.get_nowait()
+        except queue.Empty:
+            break
+    listener._thread = None
+    listener.start()
+
+
+# ─────────────────────────────────────────────────────────────
+# Metrics
+# ─────────────────────────────────────────────────────────────
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in values.items()
+        ]
+
+
+class Gauge(Metric):
+    """Set/inc/dec gauge, or a scrape-time gauge when ``collect`` is given"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), collect=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._collect = collect  # () -> {label tuple: value}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> list:
+        if self._collect is not None:
+            values = self._collect()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in values.items()
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list:
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        lines = self.header()
+        for key, series in snapshot.items():
+            for bound, count in zip(self.buckets, series):
+                le = _labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {count}")
+            le = _labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), collect=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, collect))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ─────────────────────────────────────────────────────────────
+# HTTP request metrics
+# ─────────────────────────────────────────────────────────────
+
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status and in-flight count per
+    route. A request is measured until its last ``http.response.body``
+    message is sent, so streamed responses (NDJSON, video) count in full -
+    unlike BaseHTTPMiddleware, which stops once the headers are out.
+    Requests are labelled by route template ("/detect"), not raw path, to
+    keep cardinality bounded.
+    """
+
+    def __init__(self, app, seconds: Histogram, requests: Counter, errors: Counter, in_flight: Gauge):
+        self.app = app
+        self.seconds = seconds
+        self.requests = requests
+        self.errors = errors
+        self.in_flight = in_flight
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self.in_flight.inc()
+        started = time.perf_counter()
+        status = None
+        finished = False
+
+        def finish(failed: bool = False):
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            endpoint = getattr(scope.get("route"), "path", "unmatched")
+            code = status or 500
+            self.seconds.observe(time.perf_counter() - started, endpoint=endpoint)
+            self.requests.inc(endpoint=endpoint, method=scope["method"], status=str(code))
+            if failed or code >= 500:
+                self.errors.inc(endpoint=endpoint)
+            self.in_flight.dec()
+
+        async def send_and_measure(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_and_measure)
+        except BaseException:
+            finish(failed=True)
+            raise
+        finally:
+            finish()
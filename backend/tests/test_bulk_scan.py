@@ -0,0 +1,32 @@
+import json
+
+from bulk_scan import RETRY_STATUS, load_checkpoint
+
+
+def write_rows(path, rows, tail=b""):
+    path.write_bytes(b"".join(json.dumps(row).encode() + b"\n" for row in rows) + tail)
+
+
+def test_missing_journal(tmp_path):
+    assert load_checkpoint(tmp_path / "results.jsonl") == set()
+
+
+def test_torn_last_line_is_cut(tmp_path):
+    journal = tmp_path / "results.jsonl"
+    write_rows(journal, [{"filename": "a.jpg", "status": "ok"}], tail=b'{"filename": "b.j')
+    assert load_checkpoint(journal) == {"a.jpg"}
+    assert journal.read_bytes().endswith(b"}\n")
+
+
+def test_failed_inference_rows_are_retried(tmp_path):
+    journal = tmp_path / "results.jsonl"
+    rows = [
+        {"filename": "a.jpg", "status": "ok", "items": [], "error": None},
+        {"filename": "b.jpg", "status": RETRY_STATUS, "items": [], "error": "Inference failed: boom"},
+        {"filename": "c.jpg", "status": "unreadable", "items": [], "error": "cannot identify image"},
+        {"filename": "d.jpg", "items": [], "error": None},  # journal from before statuses
+    ]
+    write_rows(journal, rows)
+    assert load_checkpoint(journal) == {"a.jpg", "c.jpg", "d.jpg"}
+    kept = [json.loads(line)["filename"] for line in journal.read_text().splitlines()]
+    assert kept == ["a.jpg", "c.jpg", "d.jpg"]
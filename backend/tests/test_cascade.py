@@ -0,0 +1,48 @@
+import numpy as np
+
+from cascade import LatencySLO, needs_escalation
+from postprocess import ClassTable
+
+TABLE = ClassTable({0: "recyclable", 1: "person"}, {})
+
+
+def boxes(*rows):
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+def test_needs_escalation():
+    assert needs_escalation(boxes(), TABLE, 0.3, 0.5)
+    assert needs_escalation(boxes([0, 0, 1, 1, 0.9, 1]), TABLE, 0.3, 0.5)  # only a person
+    assert needs_escalation(boxes([0, 0, 1, 1, 0.4, 0]), TABLE, 0.3, 0.5)
+    assert not needs_escalation(boxes([0, 0, 1, 1, 0.4, 0], [0, 0, 1, 1, 0.7, 0]), TABLE, 0.3, 0.5)
+
+
+def test_slo_disabled_never_degrades():
+    slo = LatencySLO(0)
+    assert not slo.observe(10.0, now=0)
+    assert not slo.degraded
+
+
+def test_slo_degrades_over_objective_and_recovers_after_hold():
+    slo = LatencySLO(100, window_s=1, quantile=0.95, recover=0.5, hold_s=5)
+    assert not slo.observe(0.050, now=0)
+    assert slo.observe(0.500, now=0.5)  # p95 now over 100 ms
+    assert not slo.observe(0.010, now=2)  # slow wait left the window, but held
+    assert slo.observe(0.010, now=6)  # held long enough: recovered
+    assert slo.stats()["transitions"] == 2
+
+
+def test_slo_does_not_recover_above_recover_fraction():
+    slo = LatencySLO(100, window_s=1, recover=0.5, hold_s=0)
+    slo.observe(0.5, now=0)
+    assert not slo.observe(0.070, now=2)  # under the SLO but over 50 ms
+    assert slo._degraded_since is not None
+    assert slo.observe(0.030, now=4)
+    assert slo._degraded_since is None
+
+
+def test_slo_stats_keys():
+    stats = LatencySLO(100, quantile=0.9).stats()
+    assert stats["slo_ms"] == 100
+    assert stats["wait_ms_p90"] == 0.0
+    assert stats["degraded"] is False
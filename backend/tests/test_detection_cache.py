@@ -0,0 +1,84 @@
+import time
+
+from PIL import Image
+
+from detection_cache import (
+    DetectionCache,
+    absolute_boxes,
+    bytes_key,
+    is_perceptual,
+    perceptual_key,
+    relative_boxes,
+)
+
+
+def test_lru_eviction():
+    cache = DetectionCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"  # a is now most recently used
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = DetectionCache(max_entries=4, ttl_seconds=10)
+    cache.put("a", "1")
+    now[0] += 9
+    assert cache.get("a") == "1"
+    now[0] += 2
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["entries"] == 0
+
+
+def test_disabled_cache():
+    cache = DetectionCache(max_entries=0)
+    cache.put("a", "1")
+    assert not cache.enabled
+    assert cache.get("a") is None
+
+
+def test_bind_model_invalidates_and_put_checks_model():
+    cache = DetectionCache()
+    cache.bind_model("m1")
+    cache.put("a", "1", model_id="m1")
+    cache.bind_model("m1")
+    assert cache.get("a") == "1"
+    cache.bind_model("m2")
+    assert cache.get("a") is None
+    cache.put("b", "2", model_id="m1")  # finished on a swapped-out model
+    assert cache.get("b") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_bytes_key_is_content_addressed():
+    assert bytes_key(b"abc") == bytes_key(b"abc") != bytes_key(b"abd")
+    assert not is_perceptual(bytes_key(b"abc"))
+
+
+def gradient(size):
+    image = Image.linear_gradient("L").resize(size).rotate(90, expand=True)
+    return image.convert("RGB")
+
+
+def test_perceptual_key_survives_rescaling_and_skips_flat_frames():
+    key = perceptual_key(gradient((640, 480)))
+    assert key is not None and is_perceptual(key)
+    assert perceptual_key(gradient((1280, 960))) == key
+    assert perceptual_key(Image.new("RGB", (640, 480), (4, 4, 4))) is None
+
+
+def test_relative_boxes_round_trip_to_another_resolution():
+    response = {"items": [{"id": 1, "bbox": {"x": 100, "y": 50, "w": 200, "h": 100}}], "degraded": False}
+    relative = relative_boxes(response, (800, 600))
+    assert relative["items"][0]["bbox"] == {"x": 0.125, "y": 50 / 600, "w": 0.25, "h": 100 / 600}
+    assert relative["degraded"] is False
+    assert absolute_boxes(relative, (1600, 1200))["items"][0]["bbox"] == {"x": 200, "y": 100, "w": 400, "h": 200}
+    assert response["items"][0]["bbox"]["x"] == 100  # input not modified
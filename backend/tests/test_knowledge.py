@@ -0,0 +1,93 @@
+from knowledge import (
+    BM25Index,
+    Document,
+    KeywordMatcher,
+    KnowledgeBase,
+    parse_catalogue,
+    plural_forms,
+    stem,
+    tokenize,
+)
+
+CATALOGUE = '''
+export const WASTE_KNOWLEDGE = {
+  'battery': {
+    tips: ["Tape the terminals.", "Take it to a \\"drop-off\\" point."],
+    fun_fact: "Batteries can be recycled.",
+  },
+  'bottle': {
+    tips: ["Rinse it."],
+    impact: "Saves oil.",
+  },
+};
+
+export const DEFAULT_KNOWLEDGE = {
+  'Organic': {
+    tips: ["Compost it."],
+  },
+};
+'''
+
+
+def test_tokenize_and_stem():
+    assert tokenize("Where do BATTERIES go?") == ["where", "do", "batteries", "go"]
+    assert stem("batteries") == "battery"
+    assert stem("boxes") == "box"
+    assert stem("bottles") == "bottle"
+    assert stem("glass") == "glass"
+    assert plural_forms("plastic bag") == ["plastic bag", "plastic bags"]
+    assert plural_forms("battery") == ["battery", "batteries"]
+
+
+def test_parse_catalogue():
+    sections = parse_catalogue(CATALOGUE)
+    battery = sections["WASTE_KNOWLEDGE"]["battery"]
+    assert battery["tips"] == ["Tape the terminals.", 'Take it to a "drop-off" point.']
+    assert battery["fun_fact"] == "Batteries can be recycled."
+    assert sections["WASTE_KNOWLEDGE"]["bottle"]["impact"] == "Saves oil."
+    assert sections["DEFAULT_KNOWLEDGE"]["Organic"]["tips"] == ["Compost it."]
+
+
+def test_keyword_matcher_matches_whole_words_and_plurals():
+    matcher = KeywordMatcher()
+    matcher.add("can", "can")
+    matcher.add("plastic bag", "bag")
+    assert matcher.find(tokenize("how do I scan this")) == []
+    assert matcher.find(tokenize("two cans and plastic bags")) == [(1, 1, "can"), (3, 2, "bag")]
+
+
+def test_keyword_matcher_first_value_wins():
+    matcher = KeywordMatcher()
+    matcher.add("foam", 1)
+    matcher.add("foam", 2)
+    assert matcher.find(["foam"]) == [(0, 1, 1)]
+    assert matcher.size == 2  # "foam" and "foams"
+
+
+def test_bm25_ranks_matching_document_first():
+    index = BM25Index(["battery battery acid", "glass bottle", "banana peel compost"])
+    scores = index.scores(["battery"])
+    assert set(scores) == {0}
+    assert index.scores(["bottle", "compost"]).keys() == {1, 2}
+    assert index.scores(["unknown"]) == {}
+
+
+def test_knowledge_base_answers_and_caches():
+    documents = [
+        Document(bin="Hazardous", subject="battery", tips=["Tape the terminals."]),
+        Document(bin="Recycle", subject="bottle", tips=["Rinse it."], facts=["Saves oil."]),
+        Document(bin="Organic", tips=["Compost it."]),
+        Document(bin="Organic", tips=["No plastic in compost."]),
+    ]
+    kb = KnowledgeBase(documents, cache_size=8)
+    text, bin_name = kb.answer("Where do batteries go?")
+    assert bin_name == "Hazardous"
+    assert text.startswith("Battery goes in the Hazardous bin.")
+
+    text, bin_name = kb.answer("what goes in compost")
+    assert bin_name == "Organic"
+    assert text.startswith("Use the Organic bin.")
+
+    kb.answer("where do batteries go")  # same normalized query
+    assert kb.stats()["cache_hits"] == 1
+    assert kb.stats()["documents"] == 3  # the two Organic bin documents are merged
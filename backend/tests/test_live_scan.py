@@ -0,0 +1,37 @@
+import io
+import time
+
+import pytest
+from PIL import Image
+
+from live_scan import frame_difference, frame_signature
+from preprocess import ImageTooLarge
+
+
+def encode(img, fmt):
+    buf = io.BytesIO()
+    img.save(buf, fmt)
+    return buf.getvalue()
+
+
+def test_signature_is_a_small_grayscale_thumbnail():
+    frame = encode(Image.new("RGB", (1280, 720), (200, 30, 30)), "JPEG")
+    signature = frame_signature(frame, max_pixels=50_000_000)
+    assert signature.shape == (32, 32)
+    assert frame_difference(signature, signature) == 0.0
+
+
+def test_difference_of_changed_scene():
+    dark = frame_signature(encode(Image.new("L", (320, 240), 20), "PNG"))
+    light = frame_signature(encode(Image.new("L", (320, 240), 220), "PNG"))
+    assert frame_difference(dark, light) == pytest.approx(200.0)
+
+
+def test_oversized_frame_is_refused_before_decoding():
+    # A flat 60 MP PNG compresses to a few hundred KB
+    bomb = encode(Image.new("L", (10000, 6000)), "PNG")
+    assert len(bomb) < 2 * 1024 * 1024
+    started = time.perf_counter()
+    with pytest.raises(ImageTooLarge):
+        frame_signature(bomb, max_pixels=50_000_000)
+    assert time.perf_counter() - started < 0.5
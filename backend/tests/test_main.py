@@ -0,0 +1,102 @@
+import io
+import logging
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+os.environ.setdefault("LOG_FILE", "")  # log to stderr, not backend.log
+
+main = pytest.importorskip("main")
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_unreadable_upload_is_logged_not_raised():
+    # Regression: extra={"filename": ...} collides with a reserved LogRecord
+    # attribute and made logging itself raise KeyError (a 500 for the batch)
+    capture = Capture()
+    logger = logging.getLogger("main")
+    logger.addHandler(capture)
+    try:
+        assert main.decode_image(b"definitely not an image", "notes.txt") is None
+    finally:
+        logger.removeHandler(capture)
+    (record,) = [r for r in capture.records if r.levelno == logging.WARNING]
+    assert record.upload == "notes.txt"
+    assert record.getMessage().startswith("Image read failed")
+
+
+def test_live_scan_refuses_oversized_frames(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "UPLOAD_MAX_PIXELS", 1_000_000)
+    buf = io.BytesIO()
+    Image.new("L", (4000, 4000)).save(buf, "PNG")
+    with TestClient(main.app).websocket_connect("/ws/scan") as ws:
+        ws.send_bytes(buf.getvalue())
+        message = ws.receive_json()
+    assert message["frame"] == 1
+    assert "limit is 1.0 MP" in message["error"]
+
+
+def test_tiled_passes_are_timed_per_model(monkeypatch):
+    from model_registry import ModelRegistry, ModelVersion
+    from postprocess import ClassTable
+
+    class Boxes:
+        data = np.zeros((0, 6), np.float32)
+
+    class Result:
+        boxes = Boxes()
+
+    def model(batch, **kwargs):
+        return [Result() for _ in batch]
+
+    version = ModelVersion(
+        name="fake@pytorch", model=model, table=ClassTable({0: "can"}, main.RECYCLING_TIPS),
+        path=None, backend="pytorch", cache_id="fake",
+    )
+    registry = ModelRegistry()
+    registry.publish(version)
+    monkeypatch.setattr(main, "registry", registry)
+
+    buf = io.BytesIO()
+    Image.new("RGB", (2000, 1500)).save(buf, "JPEG")
+    assert main.detect_tiled(buf.getvalue(), "shelf.jpg", "on").items == []
+    # One full-frame pass plus one batched pass over the tiles
+    assert version.latency.stats()["calls"] == 2
+
+
+def test_admin_token_is_required(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    client = TestClient(main.app)
+    assert client.get("/admin/models").status_code == 401
+    assert client.get("/admin/models", headers={"X-Admin-Token": "s3crex"}).status_code == 401
+    assert client.get("/admin/models", headers={"X-Admin-Token": "s3cret"}).status_code == 200
+
+
+def test_admin_change_refused_while_another_is_pending(monkeypatch):
+    from fastapi.testclient import TestClient
+    from model_registry import ModelControl
+
+    control = ModelControl()
+    control.update(lambda state: None, {"active": None, "candidate": None})  # generation 1, not applied here
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(main, "model_control", control)
+    monkeypatch.setattr(main, "applied_generation", 0)
+    monkeypatch.setitem(main.model_status, "state", "ready")
+    client = TestClient(main.app)
+    response = client.delete("/admin/models/candidate", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 409
+    assert control.read()["generation"] == 1
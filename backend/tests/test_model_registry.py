@@ -0,0 +1,85 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from model_registry import ControlFile, ModelControl, ModelVersion, same_weights
+
+INITIAL = {"active": {"path": "/models/a.pt", "backend": None}, "candidate": None}
+
+
+def version(path, backend=None):
+    return ModelVersion(
+        name=path, model=None, table=None, path=Path(path), backend="pytorch", cache_id=path, requested_backend=backend
+    )
+
+
+def swap_to(path):
+    def change(state):
+        state["active"] = {"path": path, "backend": None}
+
+    return change
+
+
+@pytest.fixture(params=["memory", "file"])
+def control(request, tmp_path):
+    return ModelControl() if request.param == "memory" else ControlFile(tmp_path / "models.json")
+
+
+def test_updates_bump_the_generation(control):
+    assert control.read() is None
+    first = control.update(swap_to("/models/b.pt"), INITIAL)
+    assert first == {"active": {"path": "/models/b.pt", "backend": None}, "candidate": None, "generation": 1}
+    second = control.update(swap_to("/models/c.pt"), {"active": None, "candidate": None})
+    assert second["generation"] == 2
+    assert control.read() == second
+
+
+def test_failed_change_is_not_stored(control):
+    control.update(swap_to("/models/b.pt"), INITIAL)
+
+    def change(state):
+        state["active"] = None
+        raise LookupError("no candidate")
+
+    with pytest.raises(LookupError):
+        control.update(change, INITIAL)
+    assert control.read()["generation"] == 1
+    assert control.read()["active"]["path"] == "/models/b.pt"
+
+
+def test_control_file_is_shared(tmp_path):
+    # Two workers each open the same file
+    writer, reader = ControlFile(tmp_path / "models.json"), ControlFile(tmp_path / "models.json")
+    writer.update(swap_to("/models/b.pt"), INITIAL)
+    assert reader.read()["active"]["path"] == "/models/b.pt"
+    assert reader.update(swap_to("/models/c.pt"), INITIAL)["generation"] == 2
+
+
+def test_worker_statuses(tmp_path):
+    control = ControlFile(tmp_path / "models.json", stale_after=5)
+    control.publish_status(101, {"generation": 1})
+    control.publish_status(102, {"generation": 2})
+    statuses = control.statuses()
+    assert {pid: status["generation"] for pid, status in statuses.items()} == {101: 1, 102: 2}
+
+    # A dead worker's status goes stale and is dropped
+    dead = tmp_path / "models.json.101.status"
+    dead.write_text(json.dumps({"generation": 1, "updated_at": time.time() - 60}))
+    assert list(control.statuses()) == [102]
+    assert not dead.exists()
+
+    control.update(swap_to("/models/b.pt"), INITIAL)
+    control.remove()
+    assert os.listdir(tmp_path) == []
+
+
+def test_same_weights():
+    spec = {"path": "/models/a.pt", "backend": "onnx"}
+    assert same_weights(spec, version("/models/a.pt", "onnx"))
+    assert not same_weights(spec, version("/models/a.pt"))
+    assert not same_weights(spec, version("/models/b.pt", "onnx"))
+    assert not same_weights(spec, None)
+    assert not same_weights(None, version("/models/a.pt", "onnx"))
@@ -0,0 +1,73 @@
+import numpy as np
+
+from postprocess import DEFAULT_TIP, FALLBACK_BIN, ClassTable, box_iou, boxes_to_numpy, select_top_k
+
+NAMES = {0: "recyclable", 1: "Organic", 2: "person", 3: "widget"}
+
+
+def boxes(*rows):
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+def test_class_table_maps_bins_and_ignores_people():
+    table = ClassTable(NAMES, {"recyclable": "Rinse first."})
+    assert table.names == ["recyclable", "organic", "person", "widget"]
+    assert table.item_types[1] == "Organic"
+    assert table.bins == ["Recycle", "Organic", FALLBACK_BIN, FALLBACK_BIN]
+    assert table.ignored.tolist() == [False, False, True, False]
+    assert table.metadata[0]["recycling_tips"] == "Rinse first."
+    assert table.metadata[3]["recycling_tips"] == DEFAULT_TIP
+    assert table.unknown_classes() == ["widget"]
+
+
+def test_class_table_with_gaps_in_ids():
+    table = ClassTable({0: "recyclable", 2: "organic"}, {})
+    assert len(table.names) == 3
+    assert table.names[1] == ""
+
+
+def test_select_top_k_filters_ranks_and_boosts():
+    table = ClassTable(NAMES, {})
+    data = boxes(
+        [0, 0, 10, 10, 0.50, 0],
+        [0, 0, 10, 10, 0.20, 0],  # below threshold
+        [0, 0, 10, 10, 0.99, 2],  # person: ignored
+        [0, 0, 10, 10, 0.80, 1],
+        [0, 0, 10, 10, 0.60, 9],  # unknown class id
+        [0, 0, 10, 10, 0.40, 3],
+    )
+    rows, ranks, confidences = select_top_k(data, table, conf_threshold=0.3, top_k=2)
+    assert rows[:, 5].tolist() == [1, 0]
+    # Item ids are positions among the boxes that passed the filters
+    assert ranks.tolist() == [2, 1]
+    np.testing.assert_allclose(confidences, [0.88, 0.55], rtol=1e-6)
+
+
+def test_select_top_k_caps_confidence_and_keeps_box_order_on_ties():
+    table = ClassTable(NAMES, {})
+    data = boxes(*[[i, 0, i + 1, 1, 0.9, 0] for i in range(5)])
+    rows, ranks, confidences = select_top_k(data, table, top_k=3)
+    assert rows[:, 0].tolist() == [0, 1, 2]
+    assert ranks.tolist() == [1, 2, 3]
+    assert confidences.tolist() == [0.95, 0.95, 0.95]
+
+
+def test_select_top_k_empty():
+    rows, ranks, confidences = select_top_k(boxes(), ClassTable(NAMES, {}))
+    assert rows.shape == (0, 6)
+    assert len(ranks) == len(confidences) == 0
+
+
+def test_boxes_to_numpy_reshapes():
+    class Boxes:
+        data = [[1, 2, 3, 4, 0.5, 0]]
+
+    data = boxes_to_numpy(Boxes())
+    assert data.dtype == np.float32
+    assert data.shape == (1, 6)
+
+
+def test_box_iou():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+    np.testing.assert_allclose(box_iou(a, b), [[1.0, 50 / 150, 0.0]])
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from telemetry import MetricsRegistry, RequestMetricsMiddleware
+
+
+@pytest.fixture
+def measured():
+    metrics = MetricsRegistry()
+    seconds = metrics.histogram("seconds", "latency", ("endpoint",))
+    requests = metrics.counter("requests", "requests", ("endpoint", "method", "status"))
+    errors = metrics.counter("errors", "errors", ("endpoint",))
+    in_flight = metrics.gauge("in_flight", "in flight")
+    app = FastAPI()
+    app.add_middleware(
+        RequestMetricsMiddleware, seconds=seconds, requests=requests, errors=errors, in_flight=in_flight
+    )
+    seen_in_flight = []
+
+    @app.get("/stream/{n}")
+    def stream(n: int):
+        def chunks():
+            for i in range(n):
+                time.sleep(0.05)
+                seen_in_flight.append(in_flight._values[()])
+                yield f"{i}\n"
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    return TestClient(app, raise_server_exceptions=False), seconds, requests, errors, in_flight, seen_in_flight
+
+
+def test_streamed_response_is_measured_until_the_last_chunk(measured):
+    client, seconds, requests, errors, in_flight, seen_in_flight = measured
+    assert client.get("/stream/4").text == "0\n1\n2\n3\n"
+    # Still counted as in flight while the body streams, released after
+    assert seen_in_flight == [1, 1, 1, 1]
+    assert in_flight._values[()] == 0
+    series = seconds._series[("/stream/{n}",)]
+    assert series[-1] == 1
+    assert series[-2] >= 0.2  # all four chunks, not just the headers
+    assert requests._values[("/stream/{n}", "GET", "200")] == 1
+    assert errors._values == {}
+
+
+def test_exceptions_count_as_errors(measured):
+    client, seconds, requests, errors, in_flight, _ = measured
+    assert client.get("/boom").status_code == 500
+    assert requests._values[("/boom", "GET", "500")] == 1
+    assert errors._values[("/boom",)] == 1
+    assert client.get("/missing").status_code == 404
+    assert requests._values[("unmatched", "GET", "404")] == 1
+    assert in_flight._values[()] == 0
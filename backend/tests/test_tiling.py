@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from tiling import merge_boxes, needs_tiling, nms, tile_grid, weighted_box_fusion
+
+
+def boxes(*rows):
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+def test_tile_grid_covers_image_with_edge_aligned_last_tile():
+    tiles = tile_grid(1000, 700, tile=640, overlap=0.2)
+    assert tiles == [(0, 0, 640, 640), (360, 0, 1000, 640), (0, 60, 640, 700), (360, 60, 1000, 700)]
+
+
+def test_tile_grid_small_image_is_one_tile():
+    assert tile_grid(500, 300, tile=640, overlap=0.2) == [(0, 0, 500, 300)]
+
+
+def test_tile_grid_overlap_step():
+    tiles = tile_grid(2000, 640, tile=640, overlap=0.5)
+    starts = [x0 for x0, _, _, _ in tiles]
+    assert starts == [0, 320, 640, 960, 1280, 1360]
+    assert all(x1 - x0 == 640 for x0, _, x1, _ in tiles)
+
+
+def test_needs_tiling():
+    crowded = boxes(*[[i * 100, 0, i * 100 + 90, 90, 0.9, 0] for i in range(4)])
+    big = boxes([0, 0, 2000, 1500, 0.9, 0])
+    small = boxes([0, 0, 20, 20, 0.9, 0])
+    options = dict(conf_threshold=0.3, model_size=640, min_side=1600, density=4, small_box=0.01)
+    assert not needs_tiling((1000, 800), crowded, **options)  # too small to gain detail
+    assert needs_tiling((4000, 3000), crowded, **options)
+    assert not needs_tiling((4000, 3000), big, **options)
+    assert needs_tiling((4000, 3000), small, **options)
+
+
+def test_nms_is_class_wise():
+    data = boxes(
+        [0, 0, 10, 10, 0.9, 0],
+        [1, 1, 11, 11, 0.8, 0],  # suppressed by the first
+        [1, 1, 11, 11, 0.7, 1],  # other class: kept
+        [50, 50, 60, 60, 0.6, 0],
+    )
+    kept = nms(data, iou_threshold=0.5)
+    np.testing.assert_allclose(np.sort(kept[:, 4]), [0.6, 0.7, 0.9])
+
+
+def test_weighted_box_fusion_averages_and_keeps_best_confidence():
+    data = boxes([0, 0, 10, 10, 0.9, 0], [2, 0, 12, 10, 0.3, 0])
+    fused = weighted_box_fusion(data, iou_threshold=0.5)
+    assert fused.shape == (1, 6)
+    np.testing.assert_allclose(fused[0, :4], [0.5, 0, 10.5, 10], atol=1e-5)
+    assert fused[0, 4] == np.float32(0.9)
+
+
+def test_merge_boxes_handles_empty_parts():
+    assert merge_boxes([boxes(), boxes()]).shape == (0, 6)
+    merged = merge_boxes([boxes([0, 0, 10, 10, 0.9, 0]), boxes(), boxes([0, 0, 10, 10, 0.8, 0])], "nms")
+    assert merged.shape == (1, 6)
+
+
+def test_merge_boxes_rejects_unknown_method():
+    with pytest.raises(ValueError, match="Unknown merge method"):
+        merge_boxes([boxes([0, 0, 10, 10, 0.9, 0])], "average")
@@ -0,0 +1,92 @@
+import asyncio
+import base64
+import io
+import zipfile
+
+import pytest
+
+from uploads import (
+    BatchTooLarge,
+    UploadTooLarge,
+    decode_data_url,
+    expand_uploads,
+    is_image_name,
+    read_limited,
+)
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def test_read_limited_joins_chunks():
+    assert asyncio.run(read_limited(chunks(b"ab", b"cd"), 4)) == b"abcd"
+
+
+def test_read_limited_stops_at_limit():
+    consumed = []
+
+    async def tracked():
+        for part in (b"ab", b"cd", b"ef", b"gh"):
+            consumed.append(part)
+            yield part
+
+    with pytest.raises(UploadTooLarge, match="larger than"):
+        asyncio.run(read_limited(tracked(), 5))
+    assert len(consumed) == 3  # nothing read past the chunk that crossed the limit
+
+
+def test_decode_data_url():
+    encoded = base64.b64encode(b"\xff\xd8image").decode()
+    assert decode_data_url(f"data:image/jpeg;base64,{encoded}") == b"\xff\xd8image"
+    assert decode_data_url(encoded) == b"\xff\xd8image"
+
+
+def test_decode_data_url_rejects_bad_input():
+    with pytest.raises(ValueError, match="base64 data URL"):
+        decode_data_url("data:image/jpeg,rawbytes")
+    with pytest.raises(ValueError, match="Invalid base64"):
+        decode_data_url("abc")
+
+
+def test_decode_data_url_checks_size_before_decoding():
+    encoded = base64.b64encode(b"x" * 100).decode()
+    assert len(decode_data_url(encoded, max_bytes=100)) == 100
+    with pytest.raises(UploadTooLarge):
+        decode_data_url(encoded, max_bytes=90)
+
+
+def archive(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_is_image_name():
+    assert is_image_name("photos/a.JPG")
+    assert not is_image_name("__MACOSX/photos/._a.jpg")
+    assert not is_image_name("notes.txt")
+
+
+def test_expand_uploads_unpacks_zip_members_lazily():
+    data = archive({"a.jpg": b"A", "docs/readme.txt": b"-", "b.png": b"B"})
+    sources = expand_uploads([("x.jpg", "image/jpeg", b"X"), ("set.zip", "application/zip", data)])
+    assert [name for name, _ in sources] == ["x.jpg", "a.jpg", "b.png"]
+    assert [load() for _, load in sources] == [b"X", b"A", b"B"]
+
+
+def test_expand_uploads_limits():
+    bomb = archive({"bomb.jpg": b"\0" * 100_000})
+    assert len(bomb) < 1000
+    with pytest.raises(BatchTooLarge, match="bomb.jpg"):
+        expand_uploads([("b.zip", "application/zip", bomb)], max_member_bytes=50_000)
+    with pytest.raises(BatchTooLarge, match="uncompressed"):
+        expand_uploads([("b.zip", "application/zip", bomb)], max_total_bytes=50_000)
+
+    many = archive({f"{i}.jpg": b"x" for i in range(4)})
+    with pytest.raises(BatchTooLarge, match="Too many images"):
+        expand_uploads([("m.zip", "application/zip", many)], max_images=3)
+    assert len(expand_uploads([("m.zip", "application/zip", many)], max_images=4)) == 4
@@ -0,0 +1,78 @@
+import numpy as np
+
+import video
+from postprocess import ClassTable
+from video import ObjectTally, batched
+
+TABLE = ClassTable({0: "recyclable", 1: "person"}, {})
+
+
+class FakeTracker:
+    """Replays prepared ``BYTETracker.update`` outputs, one per frame"""
+
+    def __init__(self, outputs):
+        self.outputs = iter(outputs)
+
+    def update(self, boxes, image):
+        return next(self.outputs)
+
+
+class Result:
+    def __init__(self, rows):
+        self.boxes = Boxes(rows)
+
+
+class Boxes:
+    def __init__(self, rows):
+        self.data = np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.data
+
+    def __len__(self):
+        return len(self.data)
+
+
+def tally(monkeypatch, outputs, min_frames=2):
+    monkeypatch.setattr(video, "make_tracker", lambda frame_rate: FakeTracker(outputs))
+    return ObjectTally(TABLE, frame_rate=6, min_frames=min_frames)
+
+
+def track(track_id, score, class_id):
+    return [0, 0, 10, 10, track_id, score, class_id, 0]
+
+
+def test_frame_without_confirmed_tracks(monkeypatch):
+    # Regression: BYTETracker returns a flat (0,) array when no track is
+    # activated, e.g. on frame 1 or when only new objects are seen
+    empty = np.asarray([], dtype=np.float32)
+    counter = tally(monkeypatch, [empty, np.array([track(1, 0.8, 0)]), np.array([track(1, 0.9, 0)])])
+    frame = Result([[0, 0, 10, 10, 0.4, 0]])
+    for index in range(3):
+        counter.update(index, frame)
+    assert counter.counts() == {"objects": 1, "by_bin": {"Recycle": 1}, "by_item": {"Recyclable": 1}}
+    (obj,) = counter.objects()
+    assert (obj["first_frame"], obj["last_frame"], obj["frames"]) == (1, 2, 2)
+
+
+def test_tally_votes_ignores_people_and_short_tracks(monkeypatch):
+    outputs = [
+        np.array([track(1, 0.6, 0), track(2, 0.9, 1), track(3, 0.5, 0)]),
+        np.array([track(1, 0.7, 0), track(2, 0.9, 1)]),
+    ]
+    counter = tally(monkeypatch, outputs)
+    frame = Result([[0, 0, 10, 10, 0.9, 0]])
+    counter.update(0, frame)
+    counter.update(5, frame)
+    counter.update(10, Result([]))  # no detections: tracker not called
+    (obj,) = counter.objects()
+    assert obj["itemType"] == "Recyclable"
+    assert obj["confidence"] == 0.7
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
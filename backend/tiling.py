@@ -0,0 +1,115 @@
+"""
+Tiled inference for high-resolution photos.
+
+A single pass shrinks a 4000 px bin shot to 640 px, and small items (caps,
+batteries, wrappers) shrink below what YOLO can see. Tiled mode decodes the
+photo at a higher resolution, cuts it into overlapping model-sized tiles,
+runs all tiles through the model as one batch, and merges the tile boxes
+with the full-frame boxes (class-wise NMS or weighted box fusion).
+
+It's adaptive: ``needs_tiling`` only says yes for photos that are large
+enough for tiles to add detail *and* whose single pass looks crowded or
+found small objects - an ordinary close-up of one bottle stays single-pass.
+"""
+
+import numpy as np
+
+from postprocess import box_iou
+
+
+def tile_grid(width: int, height: int, tile: int, overlap: float) -> list:
+    """
+    ``(x0, y0, x1, y1)`` tiles of at most ``tile`` px covering the image,
+    neighbours overlapping by ``overlap`` (a fraction of the tile). The last
+    row/column is aligned to the image edge instead of running past it.
+    """
+    step = max(1, int(tile * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile:
+            return [0]
+        positions = list(range(0, length - tile, step))
+        return positions + [length - tile]
+
+    return [
+        (x, y, min(x + tile, width), min(y + tile, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def needs_tiling(
+    original_size: tuple,
+    boxes: np.ndarray,
+    conf_threshold: float,
+    model_size: int,
+    min_side: int,
+    density: int,
+    small_box: float,
+) -> bool:
+    """
+    Decide from the single-pass result whether tiles are worth it.
+
+    Args:
+        original_size: ``(w, h)`` of the photo.
+        boxes: Single-pass ``(n, 6)`` boxes in original coordinates.
+        min_side: Photos whose longest side is below this never tile.
+        density: Confident detections that make a scene "crowded".
+        small_box: A confident box below this fraction of the photo area
+            suggests more small objects were missed.
+    """
+    w, h = original_size
+    if max(w, h) < max(min_side, 2 * model_size):
+        return False
+    confident = boxes[boxes[:, 4] >= conf_threshold]
+    if len(confident) >= density:
+        return True
+    areas = (confident[:, 2] - confident[:, 0]) * (confident[:, 3] - confident[:, 1])
+    return bool(np.any(areas < small_box * w * h))
+
+
+def nms(boxes: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Class-wise greedy non-maximum suppression over ``(n, 6)`` boxes"""
+    keep = []
+    for cls in np.unique(boxes[:, 5]):
+        group = boxes[boxes[:, 5] == cls]
+        group = group[np.argsort(-group[:, 4], kind="stable")]
+        while len(group):
+            keep.append(group[0])
+            ious = box_iou(group[:1, :4], group[1:, :4])[0]
+            group = group[1:][ious < iou_threshold]
+    return np.array(keep, dtype=np.float32).reshape(-1, 6)
+
+
+def weighted_box_fusion(boxes: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Class-wise weighted box fusion: overlapping boxes of the same class are
+    averaged (confidence-weighted) into one box instead of all but the best
+    being dropped. The fused confidence is the cluster's best, so an object
+    seen by two tiles isn't reported less confident than one seen by one.
+    """
+    fused = []
+    for cls in np.unique(boxes[:, 5]):
+        group = boxes[boxes[:, 5] == cls]
+        group = group[np.argsort(-group[:, 4], kind="stable")]
+        while len(group):
+            ious = box_iou(group[:1, :4], group[:, :4])[0]
+            cluster = group[ious >= iou_threshold]
+            weights = cluster[:, 4:5]
+            xyxy = (cluster[:, :4] * weights).sum(axis=0) / weights.sum()
+            fused.append([*xyxy, cluster[0, 4], cls])
+            group = group[ious < iou_threshold]
+    return np.array(fused, dtype=np.float32).reshape(-1, 6)
+
+
+MERGERS = {"nms": nms, "wbf": weighted_box_fusion}
+
+
+def merge_boxes(parts: list, method: str = "wbf", iou_threshold: float = 0.5) -> np.ndarray:
+    """Concatenate ``(n, 6)`` box arrays from the full frame and tiles and de-duplicate"""
+    if method not in MERGERS:
+        raise ValueError(f"Unknown merge method '{method}', expected one of {tuple(MERGERS)}")
+    boxes = np.concatenate([p for p in parts if len(p)] or [np.empty((0, 6), np.float32)])
+    if not len(boxes):
+        return boxes
+    return MERGERS[method](boxes, iou_threshold)
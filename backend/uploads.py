@@ -0,0 +1,138 @@
+"""
+Helpers for turning uploaded files into individual images.
+
+Batch clients (kiosks, audit tools) send either many multipart files or a
+single ZIP archive of photos. ``expand_uploads`` flattens both into a list
+of ``(name, load)`` pairs where ``load()`` returns the raw image bytes, so
+archive members are only decompressed when the pipeline gets to them. Image
+count and (uncompressed) size limits are checked up front from the ZIP
+central directory, so a zip bomb is refused before anything is inflated.
+
+Single-image clients can skip multipart entirely: ``read_limited`` collects
+a raw request body while enforcing a size limit as it streams in, and
+``decode_data_url`` turns a (JSON-carried) base64 data URL into bytes.
+"""
+
+import binascii
+import io
+import zipfile
+from pathlib import PurePosixPath
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif", ".tiff"}
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+
+def mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+class UploadTooLarge(ValueError):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload is larger than {mb(max_bytes)}.")
+        self.max_bytes = max_bytes
+
+
+class BatchTooLarge(ValueError):
+    """Too many images, or too many (uncompressed) bytes, in one batch"""
+
+
+async def iter_chunks(file, chunk_size: int = 1024 * 1024):
+    """Async chunks of an UploadFile (or anything with an async ``read(size)``)"""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def read_limited(chunks, max_bytes: int) -> bytes:
+    """
+    Join an async iterator of body chunks, raising UploadTooLarge as soon as
+    more than ``max_bytes`` arrived - an oversized body is never buffered.
+    """
+    parts, size = [], 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        parts.append(chunk)
+    return b"".join(parts)
+
+
+def decode_data_url(value: str, max_bytes: int = None) -> bytes:
+    """
+    Bytes of a ``data:image/...;base64,`` URL (or bare base64). The size is
+    checked from the encoded length, before anything is decoded. Raises
+    UploadTooLarge, or ValueError for malformed input.
+    """
+    payload = value
+    if value.startswith("data:"):
+        header, comma, payload = value.partition(",")
+        if not comma or not header.endswith(";base64"):
+            raise ValueError("Expected a base64 data URL.")
+    if max_bytes is not None and (len(payload) // 4) * 3 > max_bytes + 2:
+        raise UploadTooLarge(max_bytes)
+    try:
+        return binascii.a2b_base64(payload)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid base64: {e}") from None
+
+
+def is_zip_upload(filename: str, content_type: str) -> bool:
+    return content_type in ZIP_CONTENT_TYPES or (filename or "").lower().endswith(".zip")
+
+
+def is_image_name(name: str) -> bool:
+    path = PurePosixPath(name)
+    # Skip macOS resource forks and other hidden files
+    if any(part.startswith(".") or part == "__MACOSX" for part in path.parts):
+        return False
+    return path.suffix.lower() in IMAGE_EXTENSIONS
+
+
+def iter_zip_images(data: bytes, max_member_bytes: int = None) -> list:
+    """
+    (name, load) for every image member of a ZIP archive. Raises
+    BatchTooLarge for a member declaring more than ``max_member_bytes`` -
+    zipfile never inflates a member past its declared size, so the check
+    holds even for a crafted archive.
+    """
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    sources = []
+    for info in archive.infolist():
+        if info.is_dir() or not is_image_name(info.filename):
+            continue
+        if max_member_bytes is not None and info.file_size > max_member_bytes:
+            raise BatchTooLarge(f"{info.filename} is larger than {mb(max_member_bytes)} uncompressed.")
+        sources.append((info.filename, info.file_size, (lambda info=info: archive.read(info))))
+    return sources
+
+
+def expand_uploads(
+    uploads: list,
+    max_member_bytes: int = None,
+    max_images: int = None,
+    max_total_bytes: int = None,
+) -> list:
+    """
+    Flatten ``(filename, content_type, data)`` uploads into ``(name, load)``
+    pairs, unpacking ZIP archives into their image members.
+
+    Raises zipfile.BadZipFile for a corrupt archive, and BatchTooLarge when
+    there are more than ``max_images`` images or more than
+    ``max_total_bytes`` once archives are decompressed.
+    """
+    sources, total = [], 0
+    for filename, content_type, data in uploads:
+        if is_zip_upload(filename, content_type):
+            members = iter_zip_images(data, max_member_bytes)
+        else:
+            members = [(filename, len(data), (lambda data=data: data))]
+        for name, size, load in members:
+            total += size
+            sources.append((name, load))
+        if max_images is not None and len(sources) > max_images:
+            raise BatchTooLarge(f"Too many images, the limit is {max_images}.")
+        if max_total_bytes is not None and total > max_total_bytes:
+            raise BatchTooLarge(f"Batch is larger than {mb(max_total_bytes)} uncompressed.")
+    return sources
@@ -0,0 +1,161 @@
+"""
+Video clips: strided frame sampling and per-object counting.
+
+Conveyor-belt and bin-camera clips show the same bottle in dozens of
+consecutive frames. ``iter_frames`` decodes the clip as a stream and only
+fully decodes every ``stride``-th frame (the others are just grabbed), and
+``ObjectTally`` feeds batched detections through ultralytics' ByteTrack so
+each physical object gets one stable ID and is counted once.
+
+Only the current batch of frames is ever in memory, and per-object state
+grows with the number of objects, not with the length of the clip.
+"""
+
+
+def iter_frames(path: str, stride: int = 1, max_side: int = None):
+    """
+    Yield ``(frame_index, bgr_frame)`` for every ``stride``-th frame of a
+    video file, downscaled so the longest side is at most ``max_side``.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError("Unreadable video")
+    try:
+        index = 0
+        while True:
+            if index % stride:
+                # grab() demuxes without decoding pixels - skipped frames are cheap
+                if not capture.grab():
+                    return
+                index += 1
+                continue
+            ok, frame = capture.read()
+            if not ok:
+                return
+            if max_side:
+                h, w = frame.shape[:2]
+                scale = max_side / max(h, w)
+                if scale < 1:
+                    frame = cv2.resize(
+                        frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA
+                    )
+            yield index, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def video_info(path: str) -> dict:
+    """Frame count, fps and size from the container header, or None if unreadable"""
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        return None
+    try:
+        return {
+            "frames": int(capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+            "fps": float(capture.get(cv2.CAP_PROP_FPS)) or 30.0,
+            "width": int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        capture.release()
+
+
+def make_tracker(frame_rate: float):
+    """ByteTrack with ultralytics' default settings"""
+    from ultralytics.trackers.byte_tracker import BYTETracker
+    from ultralytics.utils import IterableSimpleNamespace, yaml_load
+    from ultralytics.utils.checks import check_yaml
+
+    cfg = IterableSimpleNamespace(**yaml_load(check_yaml("bytetrack.yaml")))
+    return BYTETracker(args=cfg, frame_rate=max(1, round(frame_rate)))
+
+
+class ObjectTally:
+    """
+    Counts tracked objects by bin.
+
+    Args:
+        table: The model's ``ClassTable`` (bin, name and ignore flag per class).
+        frame_rate: Effective rate of the *sampled* frames (fps / stride), so
+            ByteTrack keeps lost tracks alive for the right amount of time.
+        min_frames: Sampled frames a track must appear in to count - filters
+            one-frame flickers.
+    """
+
+    def __init__(self, table, frame_rate: float, min_frames: int = 2):
+        self.table = table
+        self.min_frames = min_frames
+        self.tracker = make_tracker(frame_rate)
+        self.tracks = {}  # tracker id -> per-object summary
+
+    def update(self, frame_index: int, result):
+        """Feed one frame's detections, in frame order"""
+        boxes = result.boxes.cpu().numpy()
+        if len(boxes) == 0:
+            return
+        tracked = self.tracker.update(boxes, None)
+        if len(tracked) == 0:
+            # No activated track yet (new or low-score objects): a flat (0,) array
+            return
+        # Rows: x1, y1, x2, y2, track_id, score, cls, det_index
+        for track_id, score, class_id in tracked[:, 4:7].tolist():
+            class_id = int(class_id)
+            if self.table.ignored[class_id]:
+                continue
+            track = self.tracks.get(int(track_id))
+            if track is None:
+                track = self.tracks[int(track_id)] = {
+                    "first_frame": frame_index,
+                    "frames": 0,
+                    "votes": {},
+                    "confidence": 0.0,
+                }
+            track["last_frame"] = frame_index
+            track["frames"] += 1
+            track["votes"][class_id] = track["votes"].get(class_id, 0) + 1
+            track["confidence"] = max(track["confidence"], score)
+
+    def objects(self) -> list:
+        """Counted objects, each labelled with its most frequent class"""
+        objects = []
+        for track in self.tracks.values():
+            if track["frames"] < self.min_frames:
+                continue
+            class_id = max(track["votes"], key=track["votes"].get)
+            objects.append(
+                {
+                    "id": len(objects) + 1,
+                    "itemType": self.table.item_types[class_id],
+                    "bin": self.table.bins[class_id],
+                    "confidence": round(track["confidence"], 3),
+                    "first_frame": track["first_frame"],
+                    "last_frame": track["last_frame"],
+                    "frames": track["frames"],
+                }
+            )
+        return objects
+
+    def counts(self) -> dict:
+        objects = self.objects()
+        by_bin, by_item = {}, {}
+        for obj in objects:
+            by_bin[obj["bin"]] = by_bin.get(obj["bin"], 0) + 1
+            by_item[obj["itemType"]] = by_item.get(obj["itemType"], 0) + 1
+        return {"objects": len(objects), "by_bin": by_bin, "by_item": by_item}
+
+
+def batched(frames, size: int):
+    """Group an iterator of frames into lists of ``size``"""
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
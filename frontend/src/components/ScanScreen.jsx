@@ -5,6 +5,7 @@ import { Camera, RefreshCcw, ArrowRight, ShieldCheck, Info, Leaf, Trash2, Recycl
 
 // Use environment variable for API URL (Vite uses import.meta.env)
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/detect';
+const RAW_UPLOAD_TYPES = ['image/jpeg', 'image/webp', 'image/png']; // accepted by /detect/raw
 const CHAT_URL = import.meta.env.VITE_CHAT_URL || 'http://localhost:8000/chat';
 
 const BIN_CONFIG = {
@@ -238,25 +239,24 @@ const ScanScreen = ({ onShowDetails }) => {
         setShowDetectionView(false);
 
         try {
-            // Robust base64 to File conversion
-            const arr = base64Image.split(',');
-            const mime = arr[0].match(/:(.*?);/)[1];
-            const bstr = atob(arr[1]);
-            let n = bstr.length;
-            const u8arr = new Uint8Array(n);
-            while (n--) {
-                u8arr[n] = bstr.charCodeAt(n);
+            // Let the browser decode the data URL natively, then send the bytes
+            // as the request body - no multipart wrapping on either side
+            const blob = await (await fetch(base64Image)).blob();
+
+            let response;
+            if (RAW_UPLOAD_TYPES.includes(blob.type)) {
+                response = await fetch(`${API_URL}/raw`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': blob.type },
+                    body: blob,
+                });
+            } else {
+                // Other formats (GIF, BMP, ...) still go through the multipart endpoint
+                const formData = new FormData();
+                formData.append('image', new File([blob], 'capture', { type: blob.type }));
+                response = await fetch(API_URL, { method: 'POST', body: formData });
             }
 
-            const file = new File([u8arr], 'capture.jpg', { type: mime });
-            const formData = new FormData();
-            formData.append('image', file);
-
-            const response = await fetch(API_URL, {
-                method: 'POST',
-                body: formData,
-            });
-
             if (response.ok) {
                 const data = await response.json();
                 console.log("Analysis successful:", data);